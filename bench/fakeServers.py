@@ -0,0 +1,234 @@
+"""
+Local stand-ins for the external services the pipeline calls, for offline benchmarks.
+
+Each server runs in a background thread and can add latency and fail a fraction of
+requests, so throughput, retries and back-off can be measured without spending money
+or quota.
+"""
+import abc
+import json
+import time
+import zlib
+import random
+import struct
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def _png(width: int, height: int) -> bytes:
+    """An RGB gradient PNG built with zlib, so the benchmark does not depend on Pillow."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    row = bytes(v for x in range(width) for v in (x % 256, 0, 128))
+    # Filter byte 0 per scanline; the first pixel differs per row so rows are not identical.
+    rows = b"".join(b"\0" + row[:1] + bytes([y % 256]) + row[2:] for y in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows, 6)) + chunk(b"IEND", b"")
+
+
+# Larger than the 1080p render frame, so every download is decoded and downscaled.
+PNG_BYTES = _png(2400, 1600)
+
+# MPEG-2 Layer III, 48 kbps, 24 kHz, mono: the format edge-tts produces. 144 bytes = 24 ms.
+MP3_FRAME = b"\xff\xf3\x64\xc4" + bytes(140)
+MP3_FRAME_SECONDS = 576 / 24000
+CHARS_PER_SECOND = 15
+
+
+class FakeService(abc.ABC):
+    """Base for a threaded HTTP stand-in with configurable latency and failure rate."""
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                service._dispatch(self, "GET")
+
+            def do_POST(self):
+                service._dispatch(self, "POST")
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _dispatch(self, handler, method):
+        with self._lock:
+            self.requests += 1
+            fail = self.random.random() < self.failure_rate
+            jitter = self.random.uniform(0.5, 1.5)
+        time.sleep(self.latency * jitter)
+        if fail:
+            with self._lock:
+                self.failures += 1
+            self._send(handler, 503, b'{"error": {"message": "injected failure"}}', "application/json")
+            return
+
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length) if length else b""
+        status, payload, content_type = self.handle(method, handler.path, body)
+        self._send(handler, status, payload, content_type)
+
+    def _send(self, handler, status, payload, content_type):
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        if isinstance(payload, bytes):
+            handler.send_header("Content-Length", str(len(payload)))
+            handler.end_headers()
+            handler.wfile.write(payload)
+            return
+        # A generator of events: stream them until it is exhausted, then close.
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        for part in payload:
+            handler.wfile.write(part)
+            handler.wfile.flush()
+
+    @abc.abstractmethod
+    def handle(self, method, path, body):
+        """Answer one request: return (status, payload, content type)."""
+
+
+class FakeOpenAI(FakeService):
+    """
+    OpenAI-compatible /v1/chat/completions answering narration requests. `latency` is the
+    time to first token; the completion itself is generated at `tokens_per_second`, all
+    before replying when not streaming and spread over the events when streaming.
+    """
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: int = 0,
+                 tokens_per_second: float = 200):
+        super().__init__(latency, failure_rate, seed)
+        self.tokens_per_second = tokens_per_second
+
+    def handle(self, method, path, body):
+        if method != "POST" or not path.endswith("/chat/completions"):
+            return 404, b"{}", "application/json"
+        request = json.loads(body)
+        user = next(m["content"] for m in request["messages"] if m["role"] == "user")
+        chunks = json.loads(user)
+        if isinstance(chunks, dict):
+            chunks = chunks.get("results", [])
+
+        results = [
+            {
+                "section": c.get("section"),
+                "title": c.get("title"),
+                "narration_script": self.narrate(c.get("content", "")),
+                "images": [f"{c.get('title', '')} diagram", f"{c.get('section', '')} overview"],
+            }
+            for c in chunks
+        ]
+        content = json.dumps({"results": results})
+        if request.get("stream"):
+            return 200, self.stream(request["model"], user, content), "text/event-stream"
+        time.sleep(len(content) / 4 / self.tokens_per_second)
+        return 200, json.dumps(self.completion(request["model"], user, content)).encode(), "application/json"
+
+    def stream(self, model, prompt, content, piece: int = 64):
+        """Server-sent events carrying the content in `piece`-character deltas, then usage."""
+        def event(delta, usage=None):
+            data = {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": None}],
+                "usage": usage,
+            }
+            return f"data: {json.dumps(data)}\n\n".encode()
+
+        yield event({"role": "assistant", "content": ""})
+        for start in range(0, len(content), piece):
+            time.sleep(piece / 4 / self.tokens_per_second)
+            yield event({"content": content[start:start + piece]})
+        yield event({}, usage=self.completion(model, prompt, content)["usage"])
+        yield b"data: [DONE]\n\n"
+
+    def narrate(self, content: str) -> str:
+        sentences = [s.strip() for s in content.replace("\n", " ").split(".") if s.strip()]
+        return "In this section, we look at the following. " + ". ".join(sentences[:6]) + "."
+
+    def completion(self, model, prompt, content):
+        return {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": len(prompt) // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": (len(prompt) + len(content)) // 4,
+            },
+        }
+
+
+class FakeCustomSearch(FakeService):
+    """Google Custom Search image endpoint plus the images its results link to."""
+
+    def handle(self, method, path, body):
+        parsed = urlparse(path)
+        if parsed.path.startswith("/img/"):
+            return 200, PNG_BYTES, "image/png"
+        query = parse_qs(parsed.query).get("q", [""])[0]
+        name = hashlib.sha1(query.encode()).hexdigest()[:12]
+        data = {"items": [{"link": f"{self.url}/img/{name}.png"}]}
+        return 200, json.dumps(data).encode(), "application/json"
+
+
+class FakeTTS(FakeService):
+    """Returns MP3 frames whose duration tracks the text length, like a real voice would."""
+
+    def handle(self, method, path, body):
+        text = json.loads(body).get("text", "")
+        seconds = max(0.5, len(text) / CHARS_PER_SECOND)
+        return 200, MP3_FRAME * int(seconds / MP3_FRAME_SECONDS), "audio/mpeg"
+
+
+class HttpTTSBackend:
+    """EdgeTTSNarrationGenerator backend that talks to FakeTTS instead of edge-tts."""
+
+    def __init__(self, url: str):
+        self.url = url
+
+    async def save(self, text, voice, rate, pitch, output_path):
+        import aiohttp
+
+        async with aiohttp.ClientSession() as session:
+            async with session.post(f"{self.url}/tts", json={"text": text, "voice": voice}) as res:
+                if res.status != 200:
+                    raise Exception(f"TTS backend returned {res.status}")
+                data = await res.read()
+        with open(output_path, "wb") as f:
+            f.write(data)
@@ -0,0 +1,242 @@
+"""
+Offline throughput benchmark for the narration -> images -> TTS -> merge stages.
+
+OpenAI, Google Custom Search and edge-tts are replaced by the local stand-ins in
+fakeServers.py; everything else is the real pipeline code. Each corpus size runs in its
+own subprocess (so peak RSS is per size) inside a temporary working directory (so no
+cache from a previous run is hit).
+
+    python bench/run_bench.py                       # 10, 100 and 1000 sections
+    python bench/run_bench.py --sizes 100 --llm-latency 2 --failure-rate 0.05
+    python bench/run_bench.py --update-baseline     # accept the current numbers
+
+Results are compared with bench/baselines.json; a wall time or peak RSS more than
+--tolerance above its baseline is reported as a regression and the exit code is 1.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+
+
+BENCH_DIR = Path(__file__).resolve().parent
+UTILS_DIR = BENCH_DIR.parent / "src" / "utils"
+BASELINE_FILE = BENCH_DIR / "baselines.json"
+
+DEFAULT_SIZES = [10, 100, 1000]
+DEFAULT_TOLERANCE = 0.25
+
+WORDS = (
+    "lighting pole foundation conduit cable luminaire mast anchor bolt grout concrete "
+    "contractor engineer inspection shall provide install furnish test ground rod splice "
+    "voltage circuit breaker cabinet pedestal handhole backfill trench depth specification"
+).split()
+
+
+def synthetic_corpus(size: int, seed: int = 0):
+    """Chunks in the standards.json shape with realistic section and content lengths."""
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(size):
+        section = 600 + i // 3
+        sentences = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+            for _ in range(rng.randint(4, 14))
+        ]
+        chunks.append({
+            "section": f"Section {section}",
+            "title": f"Section {section} — {' '.join(rng.sample(WORDS, 3)).title()}",
+            "content": " ".join(sentences),
+            "source": "bench",
+            "page_number": i + 1,
+        })
+    return chunks
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_worker(args):
+    """Run every stage once for one corpus size in the current (temporary) directory."""
+    from fakeServers import FakeOpenAI, FakeCustomSearch, FakeTTS, HttpTTSBackend
+
+    llm = FakeOpenAI(args.llm_latency, args.failure_rate, seed=1).start()
+    search = FakeCustomSearch(args.search_latency, args.failure_rate, seed=2).start()
+    voice = FakeTTS(args.tts_latency, args.failure_rate, seed=3).start()
+
+    # The services read their endpoints and keys at import time.
+    os.environ.update({
+        "OPENAI_BASE_URL": f"{llm.url}/v1",
+        "OPENAI_API_KEY": "bench",
+        "GOOGLE_CSE_URL": f"{search.url}/customsearch/v1",
+        "GOOGLE_API_KEY": "bench",
+        "GOOGLE_CX": "bench",
+    })
+    sys.path.insert(0, str(UTILS_DIR))
+    import generateImages
+    from inputToNarration import input_to_narration
+    from tts import EdgeTTSNarrationGenerator
+
+    work = Path.cwd()
+    (work / "src" / "utils").mkdir(parents=True, exist_ok=True)
+    corpus_path = work / "corpus.json"
+    with open(corpus_path, "w", encoding="utf-8") as f:
+        json.dump(synthetic_corpus(args.worker), f)
+
+    generateImages.INPUT_FILE = str(work / "src" / "utils" / "narrationOutput.json")
+    generateImages.OUTPUT_FILE = str(work / "src" / "utils" / "revisedNarrationOutput.json")
+    generateImages.IMAGES_DIR = str(work / "src" / "utils" / "images")
+    generateImages.CACHE_FILE = str(work / "cache" / "image_search.json")
+
+    stages = {}
+    started = time.perf_counter()
+
+    t = time.perf_counter()
+    input_to_narration(str(corpus_path))
+    stages["narration"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    asyncio.run(generateImages.main())
+    stages["images"] = time.perf_counter() - t
+
+    generator = EdgeTTSNarrationGenerator(
+        output_base_dir=str(work / "audio"), backend=HttpTTSBackend(voice.url)
+    )
+    t = time.perf_counter()
+    audio_files, merged = generator.process_narration_file(generateImages.INPUT_FILE, job_id="bench")
+    stages["tts"] = time.perf_counter() - t
+
+    # The streaming merge above overlaps with synthesis; time the standalone merge too.
+    t = time.perf_counter()
+    generator.merge_audio_files(audio_files, generator.last_chunk_indices)
+    stages["merge"] = time.perf_counter() - t
+
+    wall = time.perf_counter() - started
+    for service in (llm, search, voice):
+        service.stop()
+
+    return {
+        "sections": args.worker,
+        "wall_s": round(wall, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "stages": {name: round(seconds, 3) for name, seconds in stages.items()},
+        "audio_files": len(audio_files),
+        "merged": bool(merged),
+        "requests": {
+            "openai": [llm.requests, llm.failures],
+            "search": [search.requests, search.failures],
+            "tts": [voice.requests, voice.failures],
+        },
+        "tts_stats": generator.last_run_stats,
+    }
+
+
+def run_size(size: int, args) -> dict:
+    """Run one corpus size in a fresh interpreter and working directory."""
+    with tempfile.TemporaryDirectory(prefix=f"bench_{size}_") as work:
+        result_file = Path(work) / "result.json"
+        cmd = [
+            sys.executable, str(Path(__file__).resolve()),
+            "--worker", str(size), "--result-file", str(result_file),
+            "--llm-latency", str(args.llm_latency),
+            "--search-latency", str(args.search_latency),
+            "--tts-latency", str(args.tts_latency),
+            "--failure-rate", str(args.failure_rate),
+        ]
+        env = dict(os.environ, PYTHONPATH=str(BENCH_DIR))
+        log = subprocess.run(cmd, cwd=work, env=env, capture_output=True, text=True)
+        if log.returncode != 0 or not result_file.exists():
+            print(log.stdout[-4000:])
+            print(log.stderr[-4000:])
+            raise RuntimeError(f"Benchmark for {size} sections failed (exit {log.returncode})")
+        with open(result_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+def load_baselines() -> dict:
+    try:
+        with open(BASELINE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def compare(result: dict, baseline: dict, tolerance: float):
+    """Metrics more than `tolerance` (fractional) above their baseline."""
+    regressions = []
+    checks = [("wall_s", result["wall_s"], baseline.get("wall_s")),
+              ("peak_rss_mb", result["peak_rss_mb"], baseline.get("peak_rss_mb"))]
+    checks += [(f"stages.{name}", value, baseline.get("stages", {}).get(name))
+               for name, value in result["stages"].items()]
+    for name, value, base in checks:
+        if base and value > base * (1 + tolerance):
+            regressions.append(f"{name}: {value:g} vs baseline {base:g} (+{(value / base - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_result(result: dict, baseline: dict):
+    def delta(value, base):
+        return f" ({(value / base - 1) * 100:+.0f}%)" if base else ""
+
+    print(f"\n{result['sections']} sections")
+    print(f"   wall      {result['wall_s']:8.2f}s{delta(result['wall_s'], baseline.get('wall_s'))}")
+    print(f"   peak RSS  {result['peak_rss_mb']:8.1f}MB{delta(result['peak_rss_mb'], baseline.get('peak_rss_mb'))}")
+    for name, seconds in result["stages"].items():
+        print(f"   {name:9s} {seconds:8.2f}s{delta(seconds, baseline.get('stages', {}).get(name))}")
+    for service, (requests, failures) in result["requests"].items():
+        print(f"   {service:9s} {requests} requests, {failures} injected failures")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="Mean seconds per chat completion")
+    parser.add_argument("--search-latency", type=float, default=0.1, help="Mean seconds per search or image fetch")
+    parser.add_argument("--tts-latency", type=float, default=0.3, help="Mean seconds per TTS request")
+    parser.add_argument("--failure-rate", type=float, default=0.02, help="Fraction of requests answered with 503")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(args)
+        with open(args.result_file, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        return 0
+
+    baselines = load_baselines()
+    regressions = []
+    for size in args.sizes:
+        result = run_size(size, args)
+        baseline = baselines.get(str(size), {})
+        print_result(result, baseline)
+        regressions += [f"{size} sections, {r}" for r in compare(result, baseline, args.tolerance)]
+        if args.update_baseline:
+            baselines[str(size)] = {k: result[k] for k in ("wall_s", "peak_rss_mb", "stages")}
+
+    if args.update_baseline:
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"\nBaselines written to {BASELINE_FILE}")
+    elif regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"   {line}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+Startup profile of the web process: how long createApp() and the first request take,
+which packages the import time goes to, and the peak RSS at that point.
+
+The app is started in a fresh interpreter under `python -X importtime`, importing
+src from the repository as main.py would. It runs in a temporary directory, so what
+the app writes relative to its working directory (Flask-Session's flask_session/,
+job workspaces) never lands in the repository. The web process only enqueues jobs, so the
+rendering stack (manim, openai, edge_tts, aiohttp, PIL, pypdf) must not be loaded by
+then; any of them showing up is reported as a regression.
+
+    python bench/startup_profile.py
+    python bench/startup_profile.py --top 30 --runs 9
+    python bench/startup_profile.py --update-baseline     # accept the current numbers
+
+Timings are the median of --runs fresh interpreters, since a single cold start is too
+noisy to compare. Results are compared with the "startup" entry of bench/baselines.json;
+import time, createApp time or peak RSS more than --tolerance above its baseline is a
+regression and the exit code is 1.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+from collections import defaultdict
+from pathlib import Path
+
+from run_bench import BASELINE_FILE, DEFAULT_TOLERANCE, load_baselines
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("manim", "openai", "edge_tts", "aiohttp", "PIL", "pypdf")
+
+CHILD = """
+import sys, json, time, resource
+started = time.perf_counter()
+from src import createApp
+app = createApp()
+create_app = time.perf_counter() - started
+started = time.perf_counter()
+app.test_client().get("/")
+first_request = time.perf_counter() - started
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+with open(sys.argv[1], "w") as f:
+    json.dump({
+        "create_app_s": round(create_app, 3),
+        "first_request_s": round(first_request, 3),
+        "peak_rss_mb": round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1),
+        "heavy_modules": sorted({m.split(".")[0] for m in sys.modules} & set(sys.argv[2].split(","))),
+    }, f)
+"""
+
+
+def parse_importtime(stderr: str):
+    """Self time in seconds per top-level package, from `-X importtime` output."""
+    by_package = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|", 2)
+        by_package[name.strip().split(".")[0]] += int(self_us) / 1e6
+    return dict(by_package)
+
+
+def profile_once() -> dict:
+    with tempfile.TemporaryDirectory(prefix="startup_") as tmp:
+        result_file = Path(tmp) / "result.json"
+        cmd = [sys.executable, "-X", "importtime", "-c", CHILD, str(result_file), ",".join(HEAVY_MODULES)]
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(REPO_ROOT), os.getenv("PYTHONPATH")])))
+        log = subprocess.run(cmd, cwd=tmp, env=env, capture_output=True, text=True)
+        if log.returncode != 0 or not result_file.exists():
+            print(log.stdout[-4000:])
+            print("\n".join(l for l in log.stderr.splitlines() if not l.startswith("import time:"))[-4000:])
+            raise RuntimeError(f"App startup failed (exit {log.returncode})")
+        with open(result_file, "r", encoding="utf-8") as f:
+            result = json.load(f)
+
+    imports = parse_importtime(log.stderr)
+    result["import_s"] = round(sum(imports.values()), 3)
+    result["imports"] = {name: round(seconds, 4) for name, seconds in
+                         sorted(imports.items(), key=lambda item: item[1], reverse=True)}
+    return result
+
+
+def profile(runs: int) -> dict:
+    """Median of `runs` cold starts; the import breakdown is that of the median run."""
+    results = sorted((profile_once() for _ in range(runs)), key=lambda r: r["import_s"])
+    result = dict(results[len(results) // 2])
+    for name in ("create_app_s", "first_request_s", "peak_rss_mb"):
+        result[name] = statistics.median(r[name] for r in results)
+    result["heavy_modules"] = sorted({m for r in results for m in r["heavy_modules"]})
+    result["runs"] = runs
+    return result
+
+
+def compare(result: dict, baseline: dict, tolerance: float):
+    regressions = [f"{name} is loaded at startup" for name in result["heavy_modules"]]
+    for name in ("import_s", "create_app_s", "peak_rss_mb"):
+        base = baseline.get(name)
+        if base and result[name] > base * (1 + tolerance):
+            regressions.append(f"{name}: {result[name]:g} vs baseline {base:g} (+{(result[name] / base - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_result(result: dict, baseline: dict, top: int):
+    def delta(value, base):
+        return f" ({(value / base - 1) * 100:+.0f}%)" if base else ""
+
+    print(f"\nWeb process startup (median of {result['runs']} runs)")
+    print(f"   imports        {result['import_s']:8.3f}s{delta(result['import_s'], baseline.get('import_s'))}")
+    print(f"   createApp      {result['create_app_s']:8.3f}s{delta(result['create_app_s'], baseline.get('create_app_s'))}")
+    print(f"   first request  {result['first_request_s']:8.3f}s")
+    print(f"   peak RSS       {result['peak_rss_mb']:8.1f}MB{delta(result['peak_rss_mb'], baseline.get('peak_rss_mb'))}")
+    print(f"   heavy modules  {', '.join(result['heavy_modules']) or 'none'}")
+    print(f"\nImport time by package (top {top})")
+    for name, seconds in list(result["imports"].items())[:top]:
+        print(f"   {name:24s} {seconds * 1000:8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15, help="Packages to list in the import breakdown")
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts to take the median of")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--json", help="Also write the full result to this file")
+    args = parser.parse_args()
+
+    result = profile(args.runs)
+    baselines = load_baselines()
+    baseline = baselines.get("startup", {})
+    print_result(result, baseline, args.top)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if args.update_baseline:
+        baselines["startup"] = {k: result[k] for k in ("import_s", "create_app_s", "peak_rss_mb")}
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {BASELINE_FILE}")
+        return 0
+
+    regressions = compare(result, baseline, args.tolerance)
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"   {line}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
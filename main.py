@@ -1,6 +1,9 @@
 from src import createApp
 
-app = createApp()
+# Renderer pool workers are spawned and re-import this file as __mp_main__; only the
+# real process (run directly or imported by a WSGI server as main:app) builds the app.
+if __name__ != "__mp_main__":
+    app = createApp()
 
 if __name__ == '__main__':
     app.run(host="0.0.0.0",port=443)
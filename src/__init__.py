@@ -1,3 +1,4 @@
+import os
 from flask import Flask, session
 from flask_session import Session
 
@@ -10,7 +11,12 @@ def createApp():
     Session(app)
 
     app.config['MAX_CONTENT_LENGTH'] = 30 * 1024 * 1024
-    app.config['UPLOAD_EXTENSIONS'] = ['.pdf']
+    app.config['UPLOAD_EXTENSIONS'] = ['.pdf', '.json']
+    app.config['JOB_WORKERS'] = int(os.getenv("JOB_WORKERS", 2))
+
+    from .jobs import JobManager
+
+    app.extensions['jobs'] = JobManager(max_workers=app.config['JOB_WORKERS'])
 
     from .routes import routes
 
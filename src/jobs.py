@@ -0,0 +1,227 @@
+import os
+import sys
+import copy
+import json
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# The pipeline modules import each other by bare name, as when run from src/utils.
+UTILS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "utils")
+if UTILS_DIR not in sys.path:
+    sys.path.insert(0, UTILS_DIR)
+
+from workspace import Workspace, WORKSPACES_DIR, cleanup_workspaces
+
+# Expired workspaces are looked for at most this often, when a job is submitted.
+CLEANUP_INTERVAL = float(os.getenv("JOB_CLEANUP_INTERVAL", 600))
+
+
+class Job:
+    """State of one pipeline run, as reported by the jobs API."""
+
+    def __init__(self, job_id, input_path, stages, settings=None):
+        self.id = job_id
+        self.input_path = input_path
+        self.settings = settings or {}
+        self.status = "queued"
+        self.stages = {name: {"status": "pending"} for name in stages}
+        self.result = None
+        self.final_video = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        # Serializes writes of this job's job.json; stages report from several threads.
+        self.save_lock = threading.Lock()
+
+    @property
+    def progress(self):
+        done = sum(1 for s in self.stages.values() if s["status"] == "done")
+        return done / len(self.stages) if self.stages else 0.0
+
+    def to_dict(self):
+        """Detached copy of the job state; call with JobManager._lock held (see JobManager.snapshot)."""
+        return {
+            "id": self.id,
+            "status": self.status,
+            "settings": copy.deepcopy(self.settings),
+            "progress": round(self.progress, 3),
+            "stages": copy.deepcopy(self.stages),
+            "result": copy.deepcopy(self.result),
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Runs pipeline jobs on a bounded pool of background threads so request handlers
+    only enqueue work and return. Each job gets its own workspace under jobs_dir, which
+    every stage writes to, so jobs run concurrently without touching each other's files.
+    Workspaces of finished jobs are removed after workspace.JOB_TTL, or sooner when all
+    of them together exceed workspace.WORKSPACES_MAX_BYTES.
+    """
+
+    def __init__(self, jobs_dir=WORKSPACES_DIR, max_workers=2):
+        self.jobs_dir = jobs_dir
+        os.makedirs(jobs_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+
+    def job_dir(self, job_id):
+        return os.path.join(self.jobs_dir, job_id)
+
+    def create_job_dir(self):
+        job_id = uuid.uuid4().hex[:12]
+        os.makedirs(self.job_dir(job_id), exist_ok=True)
+        return job_id
+
+    def workspace(self, job_id):
+        return Workspace(job_id, root=self.jobs_dir)
+
+    def submit(self, job_id, input_path, settings=None):
+        """
+        Queue a pipeline run with the given render settings (see
+        manimGenerator.render_settings, which raises ValueError for bad values). With
+        preview on, the job is reported done once the preview is ready and its
+        "final_render" stage tracks the full-quality render.
+        """
+        from manimGenerator import render_settings
+        from pipeline import STAGES
+
+        settings = render_settings(settings)
+        stages = STAGES + ["final_render"] if settings["preview"] else STAGES
+        job = Job(job_id, input_path, stages, settings)
+        with self._lock:
+            self._jobs[job_id] = job
+        self._save(job)
+        self._executor.submit(self._run, job)
+        self.cleanup()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def snapshot(self, job_id):
+        """
+        State of a job as the jobs API reports it, or None if unknown. Jobs this process
+        is not tracking (after a restart, or run by another worker process) are read
+        from their job.json.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return job.to_dict()
+        if not job_id or os.path.basename(job_id) != job_id or job_id in (".", ".."):
+            return None
+        try:
+            with open(os.path.join(self.job_dir(job_id), "job.json"), "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _active(self, job):
+        return job.finished_at is None or job.stages.get("final_render", {}).get("status") == "running"
+
+    def cleanup(self, force=False):
+        """
+        Delete expired job workspaces (see workspace.cleanup_workspaces), forget their
+        jobs and release the audio they referenced, and evict old downloaded images.
+        Runs at most every CLEANUP_INTERVAL seconds unless forced.
+        """
+        from audioStore import AudioStore
+        from generateImages import cleanup_images
+
+        with self._lock:
+            if not force and time.time() - self._last_cleanup < CLEANUP_INTERVAL:
+                return []
+            self._last_cleanup = time.time()
+            active = [job_id for job_id, job in self._jobs.items() if self._active(job)]
+
+        removed = cleanup_workspaces(self.jobs_dir, keep=active)
+        cleanup_images()
+        if removed:
+            store = AudioStore("src/static/outputs/audio")
+            for job_id in removed:
+                store.release_job(job_id)
+            store.collect_garbage()
+            with self._lock:
+                for job_id in removed:
+                    self._jobs.pop(job_id, None)
+        return removed
+
+    def _report(self, job, stage, status):
+        with self._lock:
+            entry = job.stages.setdefault(stage, {})
+            entry["status"] = status
+            entry["started_at" if status == "running" else "finished_at"] = time.time()
+        self._save(job)
+
+    def _run(self, job):
+        import tracing
+        from pipeline import run_pipeline
+
+        with self._lock:
+            job.status = "running"
+        with tracing.trace(job.id) as job_trace:
+            try:
+                with tracing.span("job", job_id=job.id):
+                    result = run_pipeline(
+                        job.input_path,
+                        job_id=job.id,
+                        report=lambda s, st: self._report(job, s, st),
+                        settings=job.settings,
+                        on_final=lambda path: self._final_ready(job, path, job_trace),
+                        workspace=self.workspace(job.id),
+                    )
+                with self._lock:
+                    job.result = result
+                    job.status = "done"
+                    self._apply_final(job)
+            except Exception as e:
+                with self._lock:
+                    job.error = str(e)
+                    job.status = "failed"
+            finally:
+                job_trace.export(os.path.join(self.job_dir(job.id), "trace.json"))
+                with self._lock:
+                    job.finished_at = time.time()
+                self._save(job)
+
+    def _final_ready(self, job, path, job_trace):
+        """Swap the full-quality render in for the preview once it is done."""
+        with self._lock:
+            job.final_video = path
+            self._apply_final(job)
+        # The background render's spans arrive after the job finished, so export again.
+        job_trace.export(os.path.join(self.job_dir(job.id), "trace.json"))
+        self._save(job)
+
+    def _apply_final(self, job):
+        # Called under the lock; the final render may finish before or after the job result is set.
+        if job.final_video and job.result is not None:
+            job.result["video"] = job.final_video
+            job.result["video_quality"] = "final"
+
+    def _save(self, job):
+        """
+        Write job.json. Saves of one job are serialized and the state is taken inside the
+        save, so the last write always holds the latest state. A failed write is logged,
+        not raised: it must not fail the stage that reported progress.
+        """
+        path = os.path.join(self.job_dir(job.id), "job.json")
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with job.save_lock:
+            with self._lock:
+                state = job.to_dict()
+            try:
+                with open(tmp, "w") as f:
+                    json.dump(state, f, indent=2, default=str)
+                os.replace(tmp, path)
+            except OSError as e:
+                print(f"Could not save state of job {job.id}: {e}")
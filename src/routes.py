@@ -1,9 +1,71 @@
-from flask import Blueprint, render_template,request
-import manim
+import os
+import json
+from flask import Blueprint, render_template, request, jsonify, current_app, Response, send_file
+from werkzeug.utils import secure_filename
 
 
 routes = Blueprint('routes', __name__)
 
 @routes.route('/')
 def index():
-    return "Welcome to the Infographics Generator!"
\ No newline at end of file
+    return "Welcome to the Infographics Generator!"
+
+@routes.route('/jobs', methods=['POST'])
+def create_job():
+    """
+    Accept a PDF/JSON upload or a JSON array of chunks and queue a pipeline job.
+    Render settings (resolution, fps, preview) may be given as form fields or query parameters.
+    """
+    # src/utils is on sys.path once src.jobs has been imported by createApp
+    from manimGenerator import render_settings
+
+    jobs = current_app.extensions['jobs']
+    try:
+        settings = render_settings({key: request.values.get(key) for key in ('resolution', 'fps', 'preview')})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    upload = request.files.get('file')
+    if upload is not None:
+        filename = secure_filename(upload.filename or "")
+        ext = os.path.splitext(filename)[1].lower()
+        if ext not in current_app.config['UPLOAD_EXTENSIONS']:
+            return jsonify({"error": f"Unsupported file type '{ext}'"}), 400
+        job_id = jobs.create_job_dir()
+        input_path = os.path.join(jobs.job_dir(job_id), f"input{ext}")
+        upload.save(input_path)
+    elif request.is_json:
+        chunks = request.get_json(silent=True)
+        if not isinstance(chunks, list):
+            return jsonify({"error": "Expected a JSON array of chunks"}), 400
+        job_id = jobs.create_job_dir()
+        input_path = os.path.join(jobs.job_dir(job_id), "input.json")
+        with open(input_path, "w", encoding="utf-8") as f:
+            json.dump(chunks, f, ensure_ascii=False)
+    else:
+        return jsonify({"error": "Send a file upload or a JSON array of chunks"}), 400
+
+    jobs.submit(job_id, input_path, settings)
+    return jsonify(jobs.snapshot(job_id)), 202
+
+@routes.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    state = current_app.extensions['jobs'].snapshot(job_id)
+    if state is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(state)
+
+@routes.route('/jobs/<job_id>/trace', methods=['GET'])
+def job_trace(job_id):
+    jobs = current_app.extensions['jobs']
+    path = os.path.join(jobs.job_dir(secure_filename(job_id)), "trace.json")
+    if not os.path.exists(path):
+        return jsonify({"error": "Trace not available"}), 404
+    return send_file(os.path.abspath(path), mimetype="application/json")
+
+@routes.route('/metrics', methods=['GET'])
+def metrics():
+    # src/utils is on sys.path once src.jobs has been imported by createApp
+    from tracing import METRICS
+
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,60 @@
+from pathlib import Path
+from typing import Dict, Optional
+
+from mp3Frames import Mp3Writer
+
+
+class StreamingAudioMerger:
+    """
+    Appends chunk clips to the merged MP3 in index order as soon as they are ready.
+
+    Chunks may finish in any order: add() buffers a clip until every lower index has
+    been written or skipped, then flushes the run. Frames are copied through Mp3Writer,
+    which reserves the Xing/Info frame up front; close() fills in the final counts.
+    If a clip cannot be appended the merger gives up and close() returns None.
+    """
+
+    def __init__(self, output_path: str, expected_count: int):
+        self.output_path = Path(output_path)
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        self.expected_count = expected_count
+        self.next_index = 0
+        self.written = 0
+        self.failed = False
+        self._pending: Dict[int, Optional[str]] = {}
+        self._writer = Mp3Writer(str(self.output_path))
+
+    def add(self, index: int, path: str):
+        self._pending[index] = path
+        self._flush()
+
+    def skip(self, index: int):
+        """Mark a chunk that produced no audio so later chunks are not held back."""
+        self._pending[index] = None
+        self._flush()
+
+    def _flush(self):
+        while self.next_index in self._pending:
+            path = self._pending.pop(self.next_index)
+            if path and not self.failed:
+                try:
+                    self._writer.append(path)
+                    self.written += 1
+                except (OSError, ValueError) as e:
+                    print(f"   Streaming merge failed at chunk {self.next_index}: {e}")
+                    self.failed = True
+            self.next_index += 1
+
+    @property
+    def complete(self) -> bool:
+        return self.next_index >= self.expected_count
+
+    def close(self) -> Optional[str]:
+        """Close the output; returns its path, or None if no audio was written."""
+        if self.failed or self.written == 0:
+            self._writer.abort()
+            return None
+        self._writer.close()
+        if not self.complete:
+            print(f"   Warning: merge stopped at chunk {self.next_index} of {self.expected_count}")
+        return str(self.output_path)
@@ -0,0 +1,94 @@
+import os
+import json
+import time
+import hashlib
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+
+class AudioStore:
+    """
+    Content-addressed store for synthesized narration clips.
+
+    Clips live in <root>/store/<sha256>.mp3, keyed by the cleaned text and voice settings,
+    so identical narrations are synthesized once. Each job records the files it uses in
+    <root>/refs/<job_id>.json; collect_garbage removes audio no job refers to any more.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.store_dir = self.root / "store"
+        self.refs_dir = self.root / "refs"
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.refs_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key_for(text: str, voice: str, rate: str, pitch: str) -> str:
+        digest = hashlib.sha256()
+        for part in (text, voice, rate, pitch):
+            digest.update(part.encode("utf-8") + b"\0")
+        return digest.hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        return self.store_dir / f"{key}.mp3"
+
+    def lookup(self, key: str) -> Optional[Path]:
+        path = self.path_for(key)
+        if path.exists() and path.stat().st_size > 0:
+            return path
+        return None
+
+    def temp_path_for(self, key: str) -> Path:
+        return self.store_dir / f"{key}.{os.getpid()}.{time.time_ns()}.part"
+
+    def commit(self, temp_path: Path, key: str) -> Path:
+        """Atomically move a finished clip into the store."""
+        target = self.path_for(key)
+        os.replace(temp_path, target)
+        return target
+
+    def record_job(self, job_id: str, paths: Iterable[str]):
+        """Replace the set of audio files referenced by `job_id`."""
+        refs = sorted({str(Path(p).resolve()) for p in paths if p})
+        ref_file = self.refs_dir / f"{job_id}.json"
+        tmp = ref_file.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"job_id": job_id, "updated_at": time.time(), "files": refs}, f, indent=2)
+        os.replace(tmp, ref_file)
+
+    def release_job(self, job_id: str):
+        ref_file = self.refs_dir / f"{job_id}.json"
+        if ref_file.exists():
+            ref_file.unlink()
+
+    def referenced_files(self) -> set:
+        referenced = set()
+        for ref_file in self.refs_dir.glob("*.json"):
+            try:
+                with open(ref_file, "r", encoding="utf-8") as f:
+                    referenced.update(json.load(f).get("files", []))
+            except (OSError, json.JSONDecodeError):
+                continue
+        return referenced
+
+    def collect_garbage(self, min_age: float = 3600) -> List[str]:
+        """
+        Delete clips in the store (and legacy audio_*.mp3 files in the root) that no job
+        references. Files younger than `min_age` seconds are kept so in-flight jobs that
+        have not recorded their references yet are not affected.
+        """
+        referenced = self.referenced_files()
+        cutoff = time.time() - min_age
+        removed = []
+
+        candidates = list(self.store_dir.glob("*.mp3")) + list(self.store_dir.glob("*.part"))
+        candidates += list(self.root.glob("audio_*.mp3"))
+        for path in candidates:
+            try:
+                if str(path.resolve()) in referenced or path.stat().st_mtime > cutoff:
+                    continue
+                path.unlink()
+                removed.append(str(path))
+            except FileNotFoundError:
+                continue
+        return removed
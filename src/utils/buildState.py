@@ -0,0 +1,77 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict
+
+
+DEFAULT_STATE_PATH = "src/static/outputs/cache/build_state.json"
+
+# Bump when the shape of stored artifacts changes so stale entries are ignored.
+STATE_VERSION = 1
+MAX_AGE = 30 * 24 * 3600
+
+
+def fingerprint(chunk: Dict) -> str:
+    """Stable hash of an input chunk; every artifact derived from it is tagged with this."""
+    canonical = json.dumps(chunk, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(f"{STATE_VERSION}:{canonical}".encode("utf-8")).hexdigest()
+
+
+class BuildState:
+    """
+    Artifacts produced for each chunk fingerprint: the narration entry, its image
+    results and its audio clip. A rerun only recomputes chunks whose
+    fingerprint has no stored artifact; file artifacts that have since been deleted
+    count as missing.
+    """
+
+    FILE_KINDS = ("audio",)
+
+    def __init__(self, path: str = DEFAULT_STATE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._dirty = {}
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def get(self, fp: str, kind: str):
+        with self._lock:
+            value = self._entries.get(fp, {}).get(kind)
+        if value is not None and kind in self.FILE_KINDS and not os.path.exists(value):
+            return None
+        return value
+
+    def set(self, fp: str, kind: str, value):
+        with self._lock:
+            entry = self._entries.setdefault(fp, {})
+            entry[kind] = value
+            entry["updated_at"] = time.time()
+            self._dirty[fp] = entry
+
+    def save(self, max_age: float = MAX_AGE):
+        """
+        Merge this run's entries into the state on disk, keeping other jobs' updates.
+        Fingerprints not touched for max_age seconds are dropped.
+        """
+        with self._lock:
+            on_disk = self._load()
+            for fp, entry in self._dirty.items():
+                on_disk.setdefault(fp, {}).update(entry)
+            cutoff = time.time() - max_age
+            on_disk = {fp: e for fp, e in on_disk.items() if e.get("updated_at", 0) >= cutoff}
+            tmp = self.path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(on_disk, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+            self._entries = on_disk
+            self._dirty = {}
@@ -1,13 +1,21 @@
 import os
+import io
+import copy
 import json
+import time
 import asyncio
-import aiohttp
+import hashlib
+import threading
+from contextlib import contextmanager
 from dotenv import load_dotenv
 
+from tracing import span
+
 load_dotenv()
 
 API_KEY = os.getenv("GOOGLE_API_KEY")
 CX = os.getenv("GOOGLE_CX")
+SEARCH_URL = os.getenv("GOOGLE_CSE_URL", "https://www.googleapis.com/customsearch/v1")
 
 BASE = os.path.dirname(os.path.abspath(__file__))
 INPUT_FILE = os.path.join(BASE, "narrationOutput.json")
@@ -15,6 +23,16 @@ OUTPUT_FILE = os.path.join(BASE, "revisedNarrationOutput.json")
 
 GENERAL_PREFIX = "image of"
 
+CONCURRENCY = int(os.getenv("IMAGE_SEARCH_CONCURRENCY", 8))
+CACHE_FILE = os.path.join(BASE, "..", "static", "outputs", "cache", "image_search.json")
+CACHE_TTL = float(os.getenv("IMAGE_SEARCH_CACHE_TTL", 30 * 24 * 3600))
+
+IMAGES_DIR = os.path.join(BASE, "images")
+DOWNLOAD_CONCURRENCY = int(os.getenv("IMAGE_DOWNLOAD_CONCURRENCY", 16))
+MAX_IMAGE_BYTES = 15 * 1024 * 1024
+# Images are stored no larger than the 1080p render frame.
+RENDER_SIZE = (1920, 1080)
+
 def build_google_query(keyword):
     return f"{GENERAL_PREFIX} {keyword}"
 
@@ -22,7 +40,7 @@ async def google_image_search(session, query):
     if not query:
         return ""
 
-    url = "https://www.googleapis.com/customsearch/v1"
+    url = SEARCH_URL
     params = {
         "key": API_KEY,
         "cx": CX,
@@ -31,41 +49,268 @@ async def google_image_search(session, query):
         "num": 1
     }
 
+    with span("google_image_search", query=query) as s:
+        try:
+            async with session.get(url, params=params, timeout=25) as res:
+                text = await res.text()
+                s.set(http_status=res.status, bytes=len(text))
+                if res.status != 200:
+                    s.fail(f"HTTP {res.status}")
+                    return ""
+                data = json.loads(text)
+                items = data.get("items")
+                if not items:
+                    return ""
+                return items[0].get("link", "")
+        except Exception as e:
+            s.fail(f"{type(e).__name__}: {e}")
+            return ""
+
+def load_search_cache():
     try:
-        async with session.get(url, params=params, timeout=25) as res:
-            text = await res.text()
+        with open(CACHE_FILE) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+_cache_lock = threading.Lock()
+
+@contextmanager
+def _cache_locked():
+    """
+    Exclusive hold on the search cache: a thread lock within this process, plus flock on
+    CACHE_FILE.lock across processes where fcntl exists (not on Windows).
+    """
+    os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+    with _cache_lock, open(f"{CACHE_FILE}.lock", "a") as lock_file:
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def save_search_cache(cache):
+    """
+    Merge `cache` into the cache on disk and write the result. Concurrent jobs each
+    load, extend and save the cache, so the file is re-read under the lock and the
+    newer of two entries for a query wins, instead of the last writer dropping the
+    other jobs' results.
+    """
+    now = time.time()
+    with _cache_locked():
+        merged = load_search_cache()
+        for q, e in cache.items():
+            if e.get("fetched_at", 0) >= merged.get(q, {}).get("fetched_at", 0):
+                merged[q] = e
+        merged = {q: e for q, e in merged.items() if now - e.get("fetched_at", 0) <= CACHE_TTL}
+        tmp = f"{CACHE_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(merged, f, indent=2)
+        os.replace(tmp, CACHE_FILE)
+
+class ImageSearcher:
+    """
+    Image search shared by all lookups of one job: a query asked for by several entries
+    is searched once, and every search goes through a single pool of at most
+    `concurrency` requests. Only hits are cached, so a failed lookup is retried on the
+    next run.
+    """
+
+    def __init__(self, session, cache, concurrency=CONCURRENCY):
+        self.session = session
+        self.cache = cache
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.in_flight = {}
+
+    async def _search(self, q):
+        async with self.semaphore:
+            url = await google_image_search(self.session, q)
+        if url:
+            self.cache[q] = {"url": url, "fetched_at": time.time()}
+        return url
+
+    async def search(self, queries):
+        """Map each query to its image URL ("" when nothing was found)."""
+        now = time.time()
+        unique = list(dict.fromkeys(q for q in queries if q))
+        results = {}
+        waiting = []
+        started = 0
+        for q in unique:
+            entry = self.cache.get(q)
+            if q not in self.in_flight and entry and now - entry.get("fetched_at", 0) <= CACHE_TTL:
+                results[q] = entry["url"]
+                continue
+            if q not in self.in_flight:
+                self.in_flight[q] = asyncio.ensure_future(self._search(q))
+                started += 1
+            waiting.append(q)
+
+        cached = len(unique) - len(waiting)
+        print(f"{len(queries)} queries, {len(unique)} unique, {cached} cached, {started} to search, "
+              f"{len(waiting) - started} already in flight")
+
+        with span("image_search", queries=len(queries), unique=len(unique), cache_hits=cached):
+            # Shielded, so one caller being cancelled does not cancel a search others wait on.
+            urls = await asyncio.gather(*[asyncio.shield(self.in_flight[q]) for q in waiting])
+        results.update(zip(waiting, urls))
+        return results
+
+async def search_all(session, queries, cache, concurrency=CONCURRENCY):
+    """Look up every distinct query once; see ImageSearcher."""
+    return await ImageSearcher(session, cache, concurrency).search(queries)
+
+async def download_image(session, url):
+    """Fetch one image, following redirects. Returns its bytes, or None if it is not an image."""
+    import aiohttp
+
+    try:
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=30), allow_redirects=True, max_redirects=5) as res:
             if res.status != 200:
-                return ""
-            data = json.loads(text)
-            items = data.get("items")
-            if not items:
-                return ""
-            return items[0].get("link", "")
-    except:
-        return ""
+                return None
+            content_type = res.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if not content_type.startswith("image/"):
+                print(f"   Skipping {url}: {content_type or 'no content type'}")
+                return None
+            if res.content_length and res.content_length > MAX_IMAGE_BYTES:
+                return None
+            data = await res.read()
+            return data if len(data) <= MAX_IMAGE_BYTES else None
+    except Exception:
+        return None
 
-async def main():
-    with open(INPUT_FILE) as f:
-        data = json.load(f)
+def store_image(data, out_dir=None, size=RENDER_SIZE):
+    """
+    Downscale an image to fit the render frame and save it under its content hash.
+    Returns the file name, or None if the bytes cannot be decoded.
+    """
+    out_dir = out_dir or IMAGES_DIR
+    digest = hashlib.sha256(data).hexdigest()[:32]
+    for ext in (".jpg", ".png"):
+        try:
+            # Reused images count as fresh for cleanup_images.
+            os.utime(os.path.join(out_dir, digest + ext))
+            return digest + ext
+        except FileNotFoundError:
+            continue
 
+    from PIL import Image
+
+    try:
+        img = Image.open(io.BytesIO(data))
+        img.load()
+    except Exception:
+        return None
+
+    img.thumbnail(size)
+    if img.mode in ("RGBA", "LA", "P"):
+        name, img, fmt = digest + ".png", img.convert("RGBA"), "PNG"
+    else:
+        name, img, fmt = digest + ".jpg", img.convert("RGB"), "JPEG"
+
+    os.makedirs(out_dir, exist_ok=True)
+    tmp = os.path.join(out_dir, f"{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    img.save(tmp, fmt, quality=90)
+    os.replace(tmp, os.path.join(out_dir, name))
+    return name
+
+async def download_all(session, urls, out_dir=None, concurrency=DOWNLOAD_CONCURRENCY, output_file=None):
+    """
+    Download each distinct URL once and store it locally (in IMAGES_DIR by default).
+    Returns a mapping of URL to file path relative to the output JSON (OUTPUT_FILE by default).
+    """
+    # Resolved at call time, so callers that repoint IMAGES_DIR (the benchmarks) are honoured.
+    out_dir = out_dir or IMAGES_DIR
+    base_dir = os.path.dirname(output_file or OUTPUT_FILE)
+    semaphore = asyncio.Semaphore(concurrency)
+    unique = list(dict.fromkeys(u for u in urls if u))
+
+    async def fetch_and_store(url):
+        async with semaphore:
+            data = await download_image(session, url)
+        if data is None:
+            return None
+        name = await asyncio.to_thread(store_image, data, out_dir)
+        if name is None:
+            return None
+        return os.path.relpath(os.path.join(out_dir, name), base_dir)
+
+    with span("image_download", urls=len(unique)) as s:
+        paths = await asyncio.gather(*[fetch_and_store(u) for u in unique])
+        s.set(bytes=sum(os.path.getsize(os.path.join(base_dir, p)) for p in paths if p))
+    print(f"Downloaded {sum(1 for p in paths if p)}/{len(unique)} images to {out_dir}")
+    return dict(zip(unique, paths))
+
+def cleanup_images(images_dir=None):
+    """Evict downloaded images on the shared store limits (workspace.STORE_TTL / STORE_MAX_BYTES)."""
+    from workspace import cleanup_files
+
+    return cleanup_files(images_dir or IMAGES_DIR)
+
+def open_session():
+    """Session for image downloads: at most 4 connections to any one image host."""
+    # aiohttp and PIL are imported where they are used, so importing this module stays cheap.
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(ssl=False, limit=DOWNLOAD_CONCURRENCY, limit_per_host=4, ttl_dns_cache=300)
+    return aiohttp.ClientSession(connector=connector)
+
+def open_search_session():
+    """
+    Session for Custom Search. Every search goes to the same host, so it gets its own
+    connector without a per-host limit; search_all bounds it to CONCURRENCY.
+    """
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(limit=CONCURRENCY, ttl_dns_cache=300)
+    return aiohttp.ClientSession(connector=connector)
+
+async def attach_images(data, output_file=None):
+    """
+    Return a copy of narration data whose image keywords are replaced by search results.
+    Image paths are relative to the directory the data will be saved in (output_file).
+    """
+    data = copy.deepcopy(data)
     items = data["results"]
+    item_queries = [
+        [build_google_query(k) for k in item.get("images", [])]
+        for item in items
+    ]
 
-    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)) as session:
-        for item in items:
-            keywords = item.get("images", [])
-            queries = [build_google_query(k) for k in keywords]
-            tasks = [google_image_search(session, q) for q in queries]
-            urls = await asyncio.gather(*tasks)
+    cache = load_search_cache()
+    async with open_search_session() as search_session:
+        urls = await search_all(search_session, [q for qs in item_queries for q in qs], cache)
+    save_search_cache(cache)
+    async with open_session() as session:
+        local_paths = await download_all(session, urls.values(), output_file=output_file)
+
+    for item, queries in zip(items, item_queries):
+        item["images"] = [
+            {"query": q, "url": urls.get(q) or "", "path": local_paths.get(urls.get(q)) or ""}
+            for q in queries
+        ]
+
+    return data
+
+async def main(input_file=None, output_file=None):
+    """Attach images to a narration file; a job passes its workspace's narration and images files."""
+    input_file = input_file or INPUT_FILE
+    output_file = output_file or OUTPUT_FILE
+    with open(input_file) as f:
+        data = json.load(f)
 
-            item["images"] = [
-                {"query": q, "url": u or ""}
-                for q, u in zip(queries, urls)
-            ]
+    data = await attach_images(data, output_file)
 
-    with open(OUTPUT_FILE, "w") as f:
+    with open(output_file, "w") as f:
         json.dump(data, f, indent=2)
 
-    print("✔ Saved:", OUTPUT_FILE)
+    print("✔ Saved:", output_file)
 
 if __name__ == "__main__":
     asyncio.run(main())
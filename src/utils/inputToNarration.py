@@ -1,28 +1,25 @@
 import os
 import json
-from openai import OpenAI
+import time
+import random
+import asyncio
 from dotenv import load_dotenv
 
+from jsonStream import JsonArrayStream
+from llmCache import get_llm_cache
+from tracing import span, add_token_usage
+
 load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
 
+MODEL = "gpt-5"
 
-def input_to_narration(file_path):
-    
-    # opening the input file
-    try:
-        with open(file_path, 'r') as file:
-            input_data = json.load(file)
-    except FileNotFoundError:
-        print("input.json not found")
-
-    input = json.dumps(input_data, indent=4)
-
+# Rough budget for the chunk payload of a single request (~4 characters per token).
+MAX_BATCH_TOKENS = int(os.getenv("NARRATION_BATCH_TOKENS", 6000))
+CONCURRENCY = int(os.getenv("NARRATION_CONCURRENCY", 4))
+MAX_RETRIES = int(os.getenv("NARRATION_MAX_RETRIES", 2))
 
-    # Calling the OpenAI API
-    client = OpenAI(api_key=api_key)
-
-    SYSTEM_PROMPT = """
+SYSTEM_PROMPT = """
     You are a helpful assistant that converts technical specification documents into human-friendly narration scripts for explainer videos.
 
     ## Task
@@ -58,42 +55,208 @@ def input_to_narration(file_path):
 
     ## Output Format
     Return a valid JSON object with the following structure:
-    [
-        {
-        "section": "...",
-        "title": "...",
-        "narration_script": "...",
-        "images": ["image search query 1", "image search query 2"]
-        },
-        ...
-    ]
+    {
+        "results": [
+            {
+            "section": "...",
+            "title": "...",
+            "narration_script": "...",
+            "images": ["image search query 1", "image search query 2"]
+            },
+            ...
+        ]
+    }
 
     Ensure the response is a **single valid JSON object** with no extra commentary or text outside the JSON.
     """
 
 
-    response = client.chat.completions.create(
-        model="gpt-5",
-                
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+def make_batches(chunks, max_tokens=MAX_BATCH_TOKENS):
+    """
+    Split chunks into consecutive batches whose JSON payload stays under max_tokens.
+    A single chunk larger than the budget gets a batch of its own.
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+    for chunk in chunks:
+        tokens = estimate_tokens(json.dumps(chunk, ensure_ascii=False))
+        if current and current_tokens + tokens > max_tokens:
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(chunk)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_batch_response(content, batch):
+    """Validate a model response for one batch and return its narration list."""
+    data = json.loads(content)
+    if isinstance(data, dict):
+        data = data.get("results")
+    if not isinstance(data, list):
+        raise ValueError("response has no results array")
+    if len(data) != len(batch):
+        raise ValueError(f"expected {len(batch)} narrations, got {len(data)}")
+
+    for chunk, narration in zip(batch, data):
+        if not isinstance(narration, dict) or not narration.get("narration_script"):
+            raise ValueError(f"missing narration_script for {chunk.get('title')}")
+        fill_defaults(narration, chunk)
+    return data
+
+
+def fill_defaults(narration, chunk):
+    narration.setdefault("section", chunk.get("section"))
+    narration.setdefault("title", chunk.get("title"))
+    narration.setdefault("images", [])
+    # Where the chunk came from is a fact of the input, never the model's; the slide footer shows it.
+    for key in ("source", "page_number"):
+        if chunk.get(key) is not None:
+            narration[key] = chunk[key]
+    return narration
+
+
+async def narrate_batch(client, semaphore, batch, batch_index, offset=0, max_retries=MAX_RETRIES, refresh=False, on_result=None):
+    with span("llm.narration_batch", batch=batch_index, chunks=len(batch), model=MODEL) as s:
+        return await _narrate_batch(client, semaphore, batch, batch_index, offset, max_retries, refresh, on_result, s)
+
+
+async def stream_completion(client, payload, s, on_element):
+    """
+    Request one batch as a streamed completion and return the full response text.
+    on_element(index, narration) is called for each narration as soon as its object closes.
+    """
+    stream = await client.chat.completions.create(
+        model=MODEL,
         response_format={"type": "json_object"},
         messages=[
             {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": input}
+            {"role": "user", "content": payload}
         ],
+        stream=True,
+        stream_options={"include_usage": True},
     )
+    parser = JsonArrayStream("results")
+    async for event in stream:
+        if event.usage:
+            add_token_usage(s, event.usage)
+        if event.choices and event.choices[0].delta.content:
+            for index, narration in parser.feed(event.choices[0].delta.content):
+                on_element(index, narration)
+    return parser.text
+
+
+async def _narrate_batch(client, semaphore, batch, batch_index, offset, max_retries, refresh, on_result, s):
+    payload = json.dumps(batch, indent=4, ensure_ascii=False)
+    cache = get_llm_cache()
+    started = time.perf_counter()
+    emitted = set()
+
+    def emit(index, narration):
+        # Each chunk is announced once, even if a retry streams it again.
+        if on_result is None or index in emitted or index >= len(batch):
+            return
+        if not isinstance(narration, dict) or not narration.get("narration_script"):
+            return
+        if not emitted:
+            s.set(first_result_s=round(time.perf_counter() - started, 3))
+        emitted.add(index)
+        on_result(offset + index, fill_defaults(narration, batch[index]))
+
+    if not refresh:
+        cached = cache.get(MODEL, SYSTEM_PROMPT, payload)
+        if cached is not None:
+            try:
+                narrations = parse_batch_response(cached, batch)
+                s.set(cache_hits=1)
+                for index, narration in enumerate(narrations):
+                    emit(index, narration)
+                return narrations
+            except ValueError:
+                pass
+
+    for attempt in range(max_retries + 1):
+        async with semaphore:
+            try:
+                content = await stream_completion(client, payload, s, emit)
+                narrations = parse_batch_response(content, batch)
+                cache.put(MODEL, SYSTEM_PROMPT, payload, content)
+                return narrations
+            except Exception as e:
+                print(f"Batch {batch_index} attempt {attempt + 1} failed: {e}")
+
+        if attempt < max_retries:
+            s.incr("retries")
+            await asyncio.sleep(2 ** attempt + random.random())
+
+    print(f"Error: batch {batch_index} gave no valid narration after {max_retries + 1} attempts.")
+    s.fail(f"no valid narration after {max_retries + 1} attempts")
+    return None
+
+
+async def narrate_chunks_async(chunks, max_batch_tokens=MAX_BATCH_TOKENS, concurrency=CONCURRENCY, refresh=False,
+                               on_result=None):
+    """
+    Narrate all chunks in token-bounded batches, at most `concurrency` requests at a time.
+    Results come back in input order; chunks of a batch that kept failing get an empty
+    narration_script so the output stays aligned with the input.
+    Batches already answered are served from the LLM cache unless refresh=True.
+
+    Responses are streamed. If given, on_result(chunk_index, narration) is called from the
+    event loop as each narration is parsed, before its batch (or the whole run) finishes,
+    so downstream work can start early. It is a preview: a batch that later fails
+    validation is retried, and only the returned results are authoritative.
+    """
+    batches = make_batches(chunks, max_batch_tokens)
+    print(f"Narrating {len(chunks)} chunks in {len(batches)} batches (concurrency {concurrency})")
+
+    # Imported here so processes that never narrate do not load the openai package.
+    from openai import AsyncOpenAI
+
+    client = AsyncOpenAI(api_key=api_key)
+    semaphore = asyncio.Semaphore(concurrency)
+    offsets = [sum(len(b) for b in batches[:i]) for i in range(len(batches))]
+    with span("input_to_narration", chunks=len(chunks), batches=len(batches)):
+        batch_results = await asyncio.gather(*[
+            narrate_batch(client, semaphore, batch, i, offset, refresh=refresh, on_result=on_result)
+            for i, (batch, offset) in enumerate(zip(batches, offsets))
+        ])
+
+    results = []
+    for batch, narrations in zip(batches, batch_results):
+        if narrations is None:
+            narrations = [
+                {"section": c.get("section"), "title": c.get("title"), "narration_script": "", "images": []}
+                for c in batch
+            ]
+        results.extend(narrations)
+    return {"results": results}
 
-    response = response.choices[0].message.content
 
+def input_to_narration(file_path, max_batch_tokens=MAX_BATCH_TOKENS, concurrency=CONCURRENCY, refresh=False,
+                       output_file="src/utils/narrationOutput.json"):
+    """Narrate the chunks in `file_path` and save the result to `output_file` ."""
 
-    # Parse the JSON and save to file
+    # opening the input file
     try:
-        narration_output = json.loads(response)
-    except json.JSONDecodeError:
-        print("Error: Model output was not valid JSON.")
-        narration_output = {"results": []}
+        with open(file_path, 'r') as file:
+            input_data = json.load(file)
+    except FileNotFoundError:
+        print("input.json not found")
+        return None
+
+    narration_output = asyncio.run(narrate_chunks_async(input_data, max_batch_tokens, concurrency, refresh))
 
-    output_file = "src/utils/narrationOutput.json"
     with open(output_file, "w", encoding="utf-8") as f:
         json.dump(narration_output, f, indent=4, ensure_ascii=False)
 
-    print(f"Narration JSON saved to {output_file}")
\ No newline at end of file
+    print(f"Narration JSON saved to {output_file}")
+    return narration_output
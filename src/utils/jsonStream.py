@@ -0,0 +1,69 @@
+import json
+from typing import Dict, List, Tuple
+
+
+class JsonArrayStream:
+    """
+    Incremental parser for a streamed JSON response holding an array of objects, either
+    bare ([{...}, ...]) or under a top-level key ({"results": [{...}, ...]}).
+
+    feed() takes text fragments as they arrive and returns (index, object) for every
+    array element that closed in them, so callers can act on element 0 while the rest
+    of the array is still being generated. The full text is kept in `text` for the
+    usual json.loads validation once the stream ends.
+    """
+
+    def __init__(self, key: str = "results"):
+        self.key = key
+        self.text = ""
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_key = None
+        self._array_depth = None
+        self._element_start = None
+        self._index = 0
+        self.done = False
+
+    def feed(self, fragment: str) -> List[Tuple[int, Dict]]:
+        base = len(self.text)
+        self.text += fragment
+        closed = []
+
+        for offset, c in enumerate(fragment):
+            pos = base + offset
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._string_start is not None:
+                        self._last_key = self.text[self._string_start + 1:pos]
+                        self._string_start = None
+                continue
+
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._array_depth is None:
+                    self._string_start = pos
+            elif c in "{[":
+                if self._array_depth is not None and self._depth == self._array_depth and c == "{":
+                    self._element_start = pos
+                self._depth += 1
+                if (c == "[" and self._array_depth is None and not self.done
+                        and (self._depth == 1 or (self._depth == 2 and self._last_key == self.key))):
+                    self._array_depth = self._depth
+            elif c in "}]":
+                self._depth -= 1
+                if self._element_start is not None and self._depth == self._array_depth:
+                    element = json.loads(self.text[self._element_start:pos + 1])
+                    closed.append((self._index, element))
+                    self._element_start = None
+                    self._index += 1
+                elif c == "]" and self._array_depth is not None and self._depth == self._array_depth - 1:
+                    self._array_depth = None
+                    self.done = True
+        return closed
@@ -0,0 +1,111 @@
+import os
+import time
+import sqlite3
+import hashlib
+from pathlib import Path
+
+
+DEFAULT_DB_PATH = "src/static/outputs/cache/llm_cache.sqlite3"
+DEFAULT_TTL = float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
+DEFAULT_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 200 * 1024 ** 2))
+
+
+def cache_key(model: str, system_prompt: str, payload: str) -> str:
+    payload_hash = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    digest = hashlib.sha256()
+    for part in (model, system_prompt, payload_hash):
+        digest.update(part.encode("utf-8") + b"\0")
+    return digest.hexdigest()
+
+
+class LLMCache:
+    """
+    SQLite-backed cache of model responses keyed by model, system prompt and input payload.
+    Entries expire after `ttl` seconds; the least recently used ones are dropped once the
+    stored responses exceed `max_bytes`.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses (accessed_at)")
+
+    def _connect(self):
+        # A connection per operation keeps the cache safe to share across threads and processes.
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get(self, model: str, system_prompt: str, payload: str):
+        """Return the cached response text, or None on a miss or expired entry."""
+        key = cache_key(model, system_prompt, payload)
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            response, created_at = row
+            if self.ttl and now - created_at > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return response
+
+    def put(self, model: str, system_prompt: str, payload: str, response: str):
+        key = cache_key(model, system_prompt, payload)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, len(response.encode("utf-8")), now, now),
+            )
+        self.evict()
+
+    def evict(self):
+        """Remove expired entries, then least recently used ones until under max_bytes."""
+        with self._connect() as conn:
+            if self.ttl:
+                conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for key, size in conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                total -= size
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+
+_default_cache = None
+
+
+def get_llm_cache() -> LLMCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = LLMCache()
+    return _default_cache
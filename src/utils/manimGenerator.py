@@ -1,11 +1,35 @@
 import json, os
-from openai import OpenAI
+import re
+import ast
+import uuid
+import hashlib
+import threading
 from dotenv import load_dotenv
 import subprocess
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from llmCache import get_llm_cache
+from manimTemplate import build_script
+from renderCache import get_render_cache, scene_source
+from renderPool import get_render_pool
+from scriptCheck import validate_scene
+from tracing import span, add_token_usage, submit
 
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """OpenAI client for LLM scripts, created on first use so template-only runs never import openai."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+
+            _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return _client
 
 MANIM_SYSTEM_PROMPT = """
 You are an expert Manim scene generator for educational explainer videos.
@@ -39,28 +63,79 @@ that visually represents the content of the narration scripts as an explainer vi
 - Do **not** include audio or external assets.
 - End with a closing fade out or title card.
 - Keep visuals minimal and legible (no heavy math animation).
+- If a chunk has an "audio_duration", its part of the video must last exactly that many seconds, because the narration audio is laid over it.
 
 ### Output
 Return ONLY a complete valid Python script (no extra markdown, commentary, or JSON wrapper).
 """
 
+# Variant of the prompt used for the parallel render mode: one Scene per narration chunk.
+MANIM_SECTIONED_SYSTEM_PROMPT = MANIM_SYSTEM_PROMPT.replace(
+    "- Define a single Scene subclass called `Explainer(Scene)`.\n"
+    "- Create sequential scenes that correspond to each narration chunk.\n",
+    "- Define one Scene subclass per narration chunk, named `Section000`, `Section001`, ... in the same order as `results`.\n"
+    "- Each Section class must be self-contained: it starts from an empty frame and fades everything out at the end.\n"
+    "- Put shared helpers at module level as plain functions that take the scene as their first argument.\n"
+    "- Do not define any other Scene subclasses.\n",
+)
+
+SECTION_SCENE_PREFIX = "Section"
+
+# Scripts are built from the slide template unless the model is explicitly asked for.
+USE_LLM_SCRIPTS = os.getenv("MANIM_USE_LLM", "0") == "1"
+
+FINAL_QUALITY = "-qh"     # 1080p60
+PREVIEW_QUALITY = "-ql"   # 480p15
+PREVIEW_HEIGHT = 480
+# Full-quality renders queued behind a preview; each one already renders scenes in parallel.
+FINAL_RENDER_WORKERS = int(os.getenv("FINAL_RENDER_WORKERS", 1))
+
+# Render in warm renderer processes (renderPool) instead of one manim CLI process per scene.
+USE_RENDER_POOL = os.getenv("MANIM_RENDER_POOL", "1") == "1"
+
+# Check scripts (AST allowlist + dry run) before any frame is rendered.
+VALIDATE_SCRIPTS = os.getenv("MANIM_VALIDATE", "1") == "1"
+
+DEFAULT_RENDER_SETTINGS = {"resolution": None, "fps": None, "preview": True}
+RESOLUTION = re.compile(r"^\s*(\d{2,5})\s*[x,]\s*(\d{2,5})\s*$")
+
+_final_render_pool = None
+_final_render_lock = threading.Lock()
 
-def generate_manim_script(narration_json_path, output_dir: str = "src/static/outputs/temp"):
+_validated = {}
+_validated_lock = threading.Lock()
+
+
+def generate_manim_script(narration_json_path, output_dir: str = "src/static/outputs/temp", per_section: bool = False,
+                          refresh: bool = False, use_llm: bool = None):
+    """
+    Write a Manim script for a narration file. With per_section=True the script holds one
+    `SectionNNN` scene per narration chunk so it can be rendered with render_manim_sections.
+
+    By default the script is built from the slide template in manimTemplate, which takes
+    milliseconds and always renders. use_llm=True (or MANIM_USE_LLM=1) asks gpt-5 for
+    custom visuals instead; identical narration input is then answered from the LLM cache
+    unless refresh=True.
+    """
     with open(narration_json_path, "r") as f:
         narration_data = json.load(f)
 
-    input_json = json.dumps(narration_data, indent=2)
-    script_path = os.path.join(output_dir, f"manimScript.py")
+    return generate_manim_script_from_data(narration_data, output_dir, per_section, refresh, use_llm)
 
-    response = client.chat.completions.create(
-        model="gpt-5",
-        messages=[
-            {"role": "system", "content": MANIM_SYSTEM_PROMPT},
-            {"role": "user", "content": input_json}
-        ],
-    )
 
-    script_code = response.choices[0].message.content.strip()
+def generate_manim_script_from_data(narration_data, output_dir: str = "src/static/outputs/temp",
+                                    per_section: bool = False, refresh: bool = False, use_llm: bool = None):
+    """Same as generate_manim_script, for narration data already in memory."""
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    script_path = os.path.join(output_dir, f"manimScript.py")
+    use_llm = USE_LLM_SCRIPTS if use_llm is None else use_llm
+
+    if use_llm:
+        script_code = _llm_script(narration_data, per_section, refresh)
+    else:
+        with span("generate_manim_script", generator="template", per_section=per_section) as s:
+            script_code = build_script(narration_data, per_section, SECTION_SCENE_PREFIX)
+            s.set(bytes=len(script_code.encode("utf-8")))
 
     with open(script_path, "w", encoding="utf-8") as f:
         f.write(script_code)
@@ -68,20 +143,384 @@ def generate_manim_script(narration_json_path, output_dir: str = "src/static/out
     return script_path
 
 
+def _llm_script(narration_data, per_section: bool, refresh: bool):
+    input_json = json.dumps(narration_data, indent=2)
+    system_prompt = MANIM_SECTIONED_SYSTEM_PROMPT if per_section else MANIM_SYSTEM_PROMPT
+
+    with span("generate_manim_script", generator="llm", model="gpt-5", per_section=per_section) as s:
+        cache = get_llm_cache()
+        script_code = None if refresh else cache.get("gpt-5", system_prompt, input_json)
+
+        if script_code is None:
+            response = get_client().chat.completions.create(
+                model="gpt-5",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": input_json}
+                ],
+            )
+            add_token_usage(s, response.usage)
+
+            script_code = response.choices[0].message.content.strip()
+            cache.put("gpt-5", system_prompt, input_json, script_code)
+        else:
+            s.set(cache_hits=1)
+        s.set(bytes=len(script_code.encode("utf-8")))
+    return script_code
+
+
+def render_settings(settings=None):
+    """
+    Validated per-job render settings:
+        resolution: "WIDTH,HEIGHT" (or "WIDTHxHEIGHT") of the final video; default 1920,1080
+        fps: frame rate of the final video; default 60
+        preview: render a quick 480p15 preview first and the final video in the background
+    Raises ValueError for values manim would reject.
+    """
+    merged = dict(DEFAULT_RENDER_SETTINGS, **{k: v for k, v in (settings or {}).items() if v is not None})
+    unknown = set(merged) - set(DEFAULT_RENDER_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown render settings: {sorted(unknown)}")
+
+    if merged["resolution"]:
+        match = RESOLUTION.match(str(merged["resolution"]))
+        if not match:
+            raise ValueError("resolution must look like 1920,1080")
+        width, height = int(match.group(1)), int(match.group(2))
+        if width % 2 or height % 2:
+            raise ValueError("resolution must have even width and height")
+        merged["resolution"] = f"{width},{height}"
+    if merged["fps"]:
+        fps = int(merged["fps"])
+        if not 1 <= fps <= 120:
+            raise ValueError("fps must be between 1 and 120")
+        merged["fps"] = fps
+    if isinstance(merged["preview"], str):
+        merged["preview"] = merged["preview"].strip().lower() not in ("0", "false", "no", "off", "")
+    merged["preview"] = bool(merged["preview"])
+    return merged
+
+
+def quality_flags(settings=None, preview: bool = False):
+    """Manim CLI flags for the final render of `settings`, or for its preview."""
+    settings = render_settings(settings)
+    if preview:
+        flags = [PREVIEW_QUALITY]
+        if settings["resolution"]:
+            # Keep the final aspect ratio at preview height
+            width, height = (int(v) for v in settings["resolution"].split(","))
+            flags += ["-r", f"{round(width * PREVIEW_HEIGHT / height / 2) * 2},{PREVIEW_HEIGHT}"]
+        return flags
+
+    flags = [FINAL_QUALITY]
+    if settings["resolution"]:
+        flags += ["-r", settings["resolution"]]
+    if settings["fps"]:
+        flags += ["--fps", str(settings["fps"])]
+    return flags
+
+
+def _flag_list(quality):
+    return [quality] if isinstance(quality, str) else list(quality)
+
 
-def render_manim_video(script_path: str, output_dir: str = "src/static/outputs/video"):
+def final_render_pool():
+    global _final_render_pool
+    with _final_render_lock:
+        if _final_render_pool is None:
+            _final_render_pool = ThreadPoolExecutor(max_workers=FINAL_RENDER_WORKERS, thread_name_prefix="final-render")
+        return _final_render_pool
+
+
+def render_two_tier(render, settings=None, on_final=None):
+    """
+    Run render(flags) -> video path once or twice depending on the settings.
+
+    With preview on (the default) the preview is rendered and returned right away, and
+    the full-quality render is queued on a background pool; on_final(path) is called
+    when it finishes (on_final(None) if it fails). With preview off the full-quality
+    render is done inline and returned, and on_final is not called.
+
+    Returns:
+        Tuple of: (path of the video available now, Future of the final render or None)
+    """
+    settings = render_settings(settings)
+    if not settings["preview"]:
+        return render(quality_flags(settings)), None
+
+    preview = render(quality_flags(settings, preview=True))
+
+    def final():
+        try:
+            path = render(quality_flags(settings))
+        except Exception as e:
+            print(f"Full-quality render failed: {e}")
+            path = None
+        if on_final:
+            on_final(path)
+        return path
+
+    return preview, submit(final_render_pool(), final)
+
+
+def render_manim_video(script_path: str, output_dir: str = "src/static/outputs/video", use_cache: bool = True,
+                       audio_path: str = None, quality=FINAL_QUALITY):
+    """
+    Render the Explainer scene. `quality` is a manim quality flag or a list of flags
+    (see quality_flags); use render_two_tier for a preview first. With audio_path (the
+    merged narration of an audio-timed script) the narration is muxed in without
+    re-encoding and that file is returned.
+    """
     Path(output_dir).mkdir(parents=True, exist_ok=True)
-    output_path = Path(output_dir)
+    flags = _flag_list(quality)
+    tag = hashlib.sha1(" ".join(flags).encode("utf-8")).hexdigest()[:8]
+    # Each flag set gets its own media dir, so a preview never shadows the final render.
+    output_path = Path(output_dir) / f"explainer_{tag}"
+    video_path = None
+
+    with span("render_manim_video", scene="Explainer", quality=" ".join(flags)) as s:
+        if use_cache:
+            cache = get_render_cache()
+            key = cache.key_for(scene_source(script_path, "Explainer"), flags)
+            video_path = cache.get(key)
+            if video_path:
+                print(f"Render cache hit for Explainer: {video_path}")
+                s.set(cache_hits=1, bytes=video_path.stat().st_size)
+
+        if video_path is None:
+            # Manim will place the video under {media_dir}/videos/manimScript/1080p60/Explainer.mp4
+            video_path = run_manim(script_path, "Explainer", output_path, flags)
+            s.set(bytes=video_path.stat().st_size)
+            if use_cache:
+                cache.put(key, video_path)
+
+    if audio_path:
+        return mux_audio(video_path, audio_path, output_path / "Explainer_narrated.mp4")
+    return video_path
+
+
+def dry_run(script_path: str, scene_name: str):
+    """Play a scene without rendering frames; see renderPool.dry_run_scene."""
+    if USE_RENDER_POOL:
+        return get_render_pool().dry_run(script_path, scene_name)
+
+    # The CLI dry run catches exceptions but cannot report duration or off-screen mobjects.
+    command = ["manim", "--dry_run", script_path, scene_name]
+    result = subprocess.run(command, capture_output=True, text=True)
+    problems = [] if result.returncode == 0 else [result.stderr.strip()[-2000:] or "dry run failed"]
+    return {"problems": problems, "duration_s": None}
+
+
+def validate_script(script_path: str, scene_name: str):
+    """
+    Pre-render gate: the scene must pass the allowlist check and a dry run before a render
+    worker gets it. Results are kept per script version, so the final render after a
+    preview is not checked twice. Raises ValueError listing the problems.
+
+    Returns:
+        Estimated scene length in seconds (None if unknown)
+    """
+    mtime = Path(script_path).stat().st_mtime_ns
+    key = (str(Path(script_path).resolve()), mtime, scene_name)
+    with _validated_lock:
+        result = _validated.get(key)
+
+    if result is None:
+        with span("validate_script", scene=scene_name) as s:
+            result = validate_scene(script_path, scene_name, dry_run)
+            s.set(ok=result["ok"], estimated_s=result["duration_s"], problems=len(result["problems"]))
+            if not result["ok"]:
+                s.fail("; ".join(result["problems"]))
+        with _validated_lock:
+            _validated[key] = result
+
+    if not result["ok"]:
+        raise ValueError(f"{scene_name} in {script_path} failed validation: " + "; ".join(result["problems"]))
+    return result["duration_s"]
+
+
+def run_manim(script_path: str, scene_name: str, media_dir, flags):
+    """
+    Render one scene into media_dir and return the movie path. By default this runs in a
+    warm renderer process; MANIM_RENDER_POOL=0 falls back to one manim CLI process per call.
+    Scenes that fail validate_script never reach a renderer (unless MANIM_VALIDATE=0).
+    """
+    if VALIDATE_SCRIPTS:
+        estimated = validate_script(script_path, scene_name)
+        if estimated is not None:
+            print(f"   {scene_name}: estimated {estimated:.1f}s")
+
+    if USE_RENDER_POOL:
+        return Path(get_render_pool().render(script_path, scene_name, media_dir, flags))
 
     command = [
         "manim",
         script_path,
-        "Explainer",
-        "-pqh",  # play, high quality
-        "--media_dir", str(output_path)
+        scene_name,
+        *flags,
+        "--media_dir", str(media_dir)
+    ]
+
+    subprocess.run(command, check=True, capture_output=True, text=True)
+    return list(Path(media_dir).rglob(f"{scene_name}.mp4"))[0]
+
+
+def list_section_scenes(script_path: str):
+    """Return the SectionNNN scene class names defined in a script, in render order."""
+    with open(script_path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=script_path)
+
+    names = [
+        node.name for node in tree.body
+        if isinstance(node, ast.ClassDef)
+        and node.name.startswith(SECTION_SCENE_PREFIX)
+        and node.name[len(SECTION_SCENE_PREFIX):].isdigit()
     ]
+    return sorted(names, key=lambda n: int(n[len(SECTION_SCENE_PREFIX):]))
+
+
+def render_section(script_path: str, scene_name: str, output_dir: str, quality=FINAL_QUALITY, use_cache: bool = True):
+    """
+    Render a single scene into its own media dir so parallel renders never share files.
+    `quality` is a manim quality flag or a list of flags (see quality_flags).
+    """
+    flags = _flag_list(quality)
+    with span("render_section", scene=scene_name, quality=" ".join(flags)) as s:
+        if use_cache:
+            cache = get_render_cache()
+            key = cache.key_for(scene_source(script_path, scene_name), flags)
+            cached = cache.get(key)
+            if cached:
+                s.set(cache_hits=1, bytes=cached.stat().st_size)
+                return cached
+
+        # Scenes from different scripts may share a name, and the same scene may be rendered
+        # at preview and final quality, so both the script path and the flags are in the dir.
+        script_tag = hashlib.sha1(f"{Path(script_path).resolve()} {' '.join(flags)}".encode("utf-8")).hexdigest()[:8]
+        media_dir = Path(output_dir) / "sections" / f"{scene_name}_{script_tag}"
+        media_dir.mkdir(parents=True, exist_ok=True)
+
+        video_path = run_manim(script_path, scene_name, media_dir, flags)
+        s.set(bytes=video_path.stat().st_size)
+        if use_cache:
+            return cache.put(key, video_path)
+        return video_path
+
+
+def concat_videos(video_paths, output_path, audio_path=None):
+    """
+    Join MP4 files with the ffmpeg concat demuxer. Streams are copied, not re-encoded.
+    With audio_path the narration is muxed in by the same ffmpeg call, so the final
+    video with sound is written in a single pass.
+    """
+    output_path = Path(output_path)
+    list_file = output_path.parent / f"concat_{uuid.uuid4().hex[:8]}.txt"
+
+    try:
+        with open(list_file, "w", encoding="utf-8") as f:
+            for video in video_paths:
+                f.write(f"file '{Path(video).resolve()}'\n")
+
+        command = [
+            "ffmpeg", "-y",
+            "-f", "concat",
+            "-safe", "0",
+            "-i", str(list_file.resolve()),
+        ]
+        if audio_path:
+            command += ["-i", str(Path(audio_path).resolve()), "-map", "0:v:0", "-map", "1:a:0"]
+        command += ["-c", "copy", str(output_path.resolve())]
+        with span("ffmpeg.concat_videos", inputs=len(video_paths), audio=bool(audio_path)) as s:
+            subprocess.run(command, check=True, capture_output=True, text=True)
+            s.set(bytes=output_path.stat().st_size)
+    finally:
+        if list_file.exists():
+            list_file.unlink()
+
+    return output_path
+
+
+def mux_audio(video_path, audio_path, output_path):
+    """Lay a narration track over a rendered video, copying both streams."""
+    output_path = Path(output_path)
+    command = [
+        "ffmpeg", "-y",
+        "-i", str(Path(video_path).resolve()),
+        "-i", str(Path(audio_path).resolve()),
+        "-map", "0:v:0", "-map", "1:a:0",
+        "-c", "copy",
+        str(output_path.resolve())
+    ]
+    with span("ffmpeg.mux_audio") as s:
+        subprocess.run(command, check=True, capture_output=True, text=True)
+        s.set(bytes=output_path.stat().st_size)
+    return output_path
+
+
+def render_scenes(scenes, output_dir: str = "src/static/outputs/video", quality=FINAL_QUALITY,
+                  max_workers: int = None, use_cache: bool = True):
+    """
+    Render (script_path, scene_name) pairs in parallel.
+
+    Each scene renders in its own process (a warm renderer worker, or a manim CLI process),
+    so the pool is sized to the number of cores.
+    A failing scene is reported and skipped rather than aborting the others.
+
+    Returns:
+        List of clip paths aligned with `scenes`, with None for scenes that failed
+    """
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    workers = max_workers or os.cpu_count() or 1
+    print(f"Rendering {len(scenes)} scenes with {workers} workers...")
+
+    clips = [None] * len(scenes)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            submit(pool, render_section, script_path, name, output_dir, quality, use_cache): i
+            for i, (script_path, name) in enumerate(scenes)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            name = scenes[i][1]
+            try:
+                clips[i] = future.result()
+                print(f"   Rendered {name}")
+            except subprocess.CalledProcessError as e:
+                print(f"   Render failed for {name}:")
+                print(e.stderr)
+            except Exception as e:
+                print(f"   Render failed for {name}: {e}")
+    return clips
+
+
+def render_manim_sections(script_path: str,
+                          output_dir: str = "src/static/outputs/video",
+                          quality=FINAL_QUALITY,
+                          max_workers: int = None,
+                          use_cache: bool = True,
+                          audio_path: str = None):
+    """
+    Render every SectionNNN scene of a script in parallel and stitch the clips together.
+
+    A failing section is reported and left out; the remaining clips are still joined.
+    Sections whose source is unchanged are served from the render cache.
+    With audio_path the narration is muxed in by the same stream-copy ffmpeg pass. If a
+    section failed the video is joined without it, since picture and sound would drift.
+
+    Returns:
+        Tuple of: (Path to the joined video or None, list of failed scene names)
+    """
+    scene_names = list_section_scenes(script_path)
+    if not scene_names:
+        raise ValueError(f"No {SECTION_SCENE_PREFIX}NNN scenes found in {script_path}")
 
-    subprocess.run(command, check=True)
-    # Manim will place the video under {output_dir}/videos/Explainer/1080p60/Explainer.mp4
-    return list(output_path.rglob("Explainer.mp4"))[0]
+    clips = render_scenes([(script_path, name) for name in scene_names], output_dir, quality, max_workers, use_cache)
+    failed = [name for name, clip in zip(scene_names, clips) if clip is None]
+    ordered = [clip for clip in clips if clip is not None]
+    if not ordered:
+        return None, failed
 
+    merged_path = concat_videos(ordered, Path(output_dir) / "Explainer.mp4", None if failed else audio_path)
+    if failed:
+        print(f"Sections left out of the final video: {failed}")
+    return merged_path, failed
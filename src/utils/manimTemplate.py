@@ -0,0 +1,253 @@
+import re
+import textwrap
+from typing import Dict, List, Optional
+
+
+# Sentence ends, not counting abbreviations such as "Dept." or "No."
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])(?<!\bDept\.)(?<!\bNo\.)\s+(?=[A-Z0-9"“])')
+# Spoken lead-ins that make no sense on a slide
+FILLER = re.compile(
+    r"^(in this section|let[’']s take a look at|let[’']s look at|essentially|in short|"
+    r"in other words|simply put|basically|here|now|so|next|finally|overall)\b[,:]?\s*",
+    re.IGNORECASE,
+)
+# Cross-references worth a tag on the right: "Section 680", "ANSI/NECA 505-2010", "NIST Handbook 44"
+REFERENCE = re.compile(r"\bSections? \d{3,}\b|\b[A-Z]{3,}(?:/[A-Z]{3,})?(?: Handbook)? \d[\d.\-–]*\b")
+EMPHASIS = re.compile(r"\b(must|shall|required|at no additional cost|only)\b", re.IGNORECASE)
+
+MAX_BULLETS = 5
+MAX_BULLET_CHARS = 90
+WRAP_CHARS = 56
+MAX_TAGS = 4
+HOLD_SECONDS = 2.0
+CLEAR_SECONDS = 0.6
+
+HELPERS = '''from manim import *
+
+
+def fit_width(mobject, margin=1.2):
+    limit = config.frame_width - margin
+    if mobject.width > limit:
+        mobject.scale_to_fit_width(limit)
+    return mobject
+
+
+def frames(seconds):
+    """A run time covering a whole number of frames, so scene time and clip length agree."""
+    n = max(1, round(seconds * config.frame_rate))
+    return n / config.frame_rate - 1e-6
+
+
+def hold_until(scene, target):
+    """Wait until the scene clock reaches `target` seconds (nothing if already past it)."""
+    remaining = target - scene.renderer.time
+    if remaining >= 1 / config.frame_rate:
+        scene.wait(frames(remaining))
+
+
+def show_title_card(scene, title_text, subtitle_text=None):
+    title = fit_width(Text(title_text, weight=BOLD).scale(0.9))
+    scene.play(FadeIn(title, shift=UP, run_time=0.8))
+    if subtitle_text:
+        subtitle = fit_width(Text(subtitle_text, font_size=36, slant=ITALIC)).next_to(title, DOWN)
+        scene.play(Write(subtitle))
+        scene.wait(0.5)
+        return VGroup(title, subtitle)
+    scene.wait(0.5)
+    return VGroup(title)
+
+
+def slide(scene, title_text, bullets, right_tags=None, emphasis_index=None, footer_note=None, budget=None):
+    """
+    Build up a slide. With a budget (seconds of narration) the build-up is sped up to
+    take at most half of it, leaving the rest for the viewer to read along.
+    """
+    intro = 2.0 + (0.9 if emphasis_index is not None else 0) + (0.6 if right_tags else 0) + (0.3 if footer_note else 0)
+    pace = min(1.0, 0.5 * budget / intro) if budget else 1.0
+    title = fit_width(Text(title_text, weight=BOLD, font_size=46)).to_edge(UP)
+    bullet_list = VGroup(*[Text("• " + b, font_size=28, line_spacing=0.8) for b in bullets])
+    bullet_list.arrange(DOWN, aligned_edge=LEFT, buff=0.3)
+    if right_tags:
+        bullet_list.scale_to_fit_width(min(bullet_list.width, config.frame_width * 0.58))
+    else:
+        fit_width(bullet_list, margin=1.6)
+    if bullet_list.height > config.frame_height - 3:
+        bullet_list.scale_to_fit_height(config.frame_height - 3)
+    bullet_list.next_to(title, DOWN, buff=0.5).to_edge(LEFT, buff=0.8)
+    scene.play(Write(title, run_time=frames(1.0 * pace)))
+    scene.play(LaggedStart(*[FadeIn(m, shift=RIGHT) for m in bullet_list], lag_ratio=0.1, run_time=frames(1.0 * pace)))
+
+    surrounds = []
+    if emphasis_index is not None and 0 <= emphasis_index < len(bullets):
+        sr = SurroundingRectangle(bullet_list[emphasis_index], color=YELLOW, buff=0.15)
+        scene.play(Create(sr, run_time=frames(0.6 * pace)))
+        surrounds.append(sr)
+        scene.wait(frames(0.3 * pace))
+
+    tags_group = None
+    if right_tags:
+        tags_group = VGroup()
+        for i, tag in enumerate(right_tags):
+            box = Rectangle(width=4.6, height=0.6, stroke_color=WHITE, fill_color=BLUE_E, fill_opacity=0.2)
+            label = Text(tag, font_size=28)
+            if label.width > box.width - 0.3:
+                label.scale_to_fit_width(box.width - 0.3)
+            label.move_to(box.get_center())
+            tagg = VGroup(box, label)
+            if i == 0:
+                tagg.to_edge(RIGHT, buff=0.5).shift(UP * 1.2)
+            else:
+                tagg.next_to(tags_group[-1], DOWN, buff=0.25).align_to(tags_group[-1], RIGHT)
+            tags_group.add(tagg)
+        scene.play(FadeIn(tags_group, shift=LEFT, run_time=frames(0.6 * pace)))
+
+    footer_mob = None
+    if footer_note:
+        footer_mob = fit_width(Text(footer_note, font_size=26, color=GREY_B)).to_edge(DOWN)
+        scene.play(FadeIn(footer_mob, shift=UP, run_time=frames(0.3 * pace)))
+    return title, bullet_list, tags_group, surrounds, footer_mob
+
+
+def clear_slide(scene, *mobjects, run_time=0.6):
+    anims = []
+    for m in mobjects:
+        if m is None:
+            continue
+        if isinstance(m, (list, tuple)):
+            anims.extend(FadeOut(sub) for sub in m)
+        else:
+            anims.append(FadeOut(m))
+    if anims:
+        scene.play(*anims, run_time=frames(run_time))
+'''
+
+
+def _shorten(sentence: str, limit: int = MAX_BULLET_CHARS) -> str:
+    sentence = sentence.strip().rstrip(".")
+    if len(sentence) <= limit:
+        return sentence
+    return sentence[:limit].rsplit(" ", 1)[0].rstrip(",;:") + "…"
+
+
+def bullets_for(narration: str, max_bullets: int = MAX_BULLETS) -> List[str]:
+    """Turn a narration script into short slide bullets, one per sentence, lead-ins removed."""
+    bullets = []
+    for sentence in SENTENCE_BOUNDARY.split(" ".join(narration.split())):
+        sentence = FILLER.sub("", sentence.strip())
+        if len(sentence) < 12:
+            continue
+        bullets.append(_shorten(sentence[0].upper() + sentence[1:]))
+        if len(bullets) == max_bullets:
+            break
+    return bullets
+
+
+def tags_for(narration: str, own_section: str = "", max_tags: int = MAX_TAGS) -> List[str]:
+    """Distinct cross-references mentioned in the narration, other than the section itself."""
+    tags = []
+    for match in REFERENCE.finditer(narration):
+        tag = match.group(0).rstrip(".-–")
+        if tag != own_section and tag not in tags:
+            tags.append(tag)
+    return tags[:max_tags]
+
+
+def emphasis_for(bullets: List[str]) -> Optional[int]:
+    return next((i for i, b in enumerate(bullets) if EMPHASIS.search(b)), None)
+
+
+def footer_for(entry: Dict) -> Optional[str]:
+    source = entry.get("source")
+    page = entry.get("page_number")
+    if source and page:
+        return f"{source}, p. {page}"
+    return source or None
+
+
+def _wrap(bullet: str) -> str:
+    return "\n".join(textwrap.wrap(bullet, WRAP_CHARS)) or bullet
+
+
+def slide_code(entry: Dict, start: float = None, duration: float = None, indent: str = "        ") -> str:
+    """
+    Statements that present one narration entry as a slide inside construct().
+    With a duration (seconds of narration audio starting at `start` on the scene clock)
+    the slide is cleared exactly when its narration ends; otherwise it is held for
+    HOLD_SECONDS.
+    """
+    narration = entry.get("narration_script", "")
+    title = " ".join((entry.get("title") or entry.get("section") or "Overview").split())
+    bullets = [_wrap(b) for b in bullets_for(narration)] or [_wrap(_shorten(title))]
+    lines = [
+        f"# {title}",
+        "t, bl, tg, sr, ft = slide(",
+        "    self,",
+        f"    {title!r},",
+        "    bullets=[",
+        *[f"        {b!r}," for b in bullets],
+        "    ],",
+        f"    right_tags={tags_for(narration, entry.get('section') or '')!r},",
+        f"    emphasis_index={emphasis_for(bullets)!r},",
+        f"    footer_note={footer_for(entry)!r},",
+    ]
+    if duration:
+        end = start + duration - CLEAR_SECONDS
+        lines += [
+            f"    budget={duration - CLEAR_SECONDS:.3f},",
+            ")",
+            f"hold_until(self, {end:.3f})",
+            f"clear_slide(self, t, bl, tg, sr, ft, run_time={CLEAR_SECONDS})",
+        ]
+    else:
+        lines += [
+            ")",
+            f"self.wait({HOLD_SECONDS})",
+            "clear_slide(self, t, bl, tg, sr, ft)",
+        ]
+    return "\n".join(indent + line if line else line for line in lines)
+
+
+def build_script(narration_data: Dict, per_section: bool = False, scene_prefix: str = "Section") -> str:
+    """
+    Manim source for narration data in the {"results": [...]} shape.
+
+    per_section=False gives one `Explainer` scene with an opening and closing card;
+    per_section=True gives one self-contained `SectionNNN` scene per entry, for the
+    parallel renderer. The output only depends on the input, so identical narration
+    always yields an identical script (and a render cache hit).
+
+    Entries carrying "audio_duration" (seconds of their narration clip) are timed to it,
+    so the video lines up with the merged narration. A timed Explainer has no opening
+    card, because the narration starts at 0.
+    """
+    entries = [e for e in narration_data.get("results", []) if isinstance(e, dict)]
+    timed = any(e.get("audio_duration") for e in entries)
+    parts = [HELPERS]
+
+    if per_section:
+        for i, entry in enumerate(entries):
+            code = slide_code(entry, 0.0, entry.get("audio_duration"))
+            parts.append(f"\nclass {scene_prefix}{i:03d}(Scene):\n    def construct(self):\n{code}\n")
+    else:
+        sections = list(dict.fromkeys(e.get("section") for e in entries if e.get("section")))
+        heading = f"{sections[0]} – {sections[-1]}" if len(sections) > 1 else (sections[0] if sections else "Overview")
+        body = []
+        if not timed:
+            body += [
+                "        header = show_title_card(self, " + repr(heading) + ", 'Key specifications explained')",
+                "        self.play(FadeOut(header))",
+                "",
+            ]
+        start = 0.0
+        for entry in entries:
+            duration = entry.get("audio_duration") or (HOLD_SECONDS + CLEAR_SECONDS) if timed else None
+            body += [slide_code(entry, start, duration), ""]
+            start += duration or 0.0
+        body += [
+            "        end = show_title_card(self, 'End of Explainer', "
+            "'Refer to the Contract and referenced Sections for full requirements.')",
+            "        self.play(FadeOut(end, run_time=0.8))",
+        ]
+        parts.append("\nclass Explainer(Scene):\n    def construct(self):\n" + "\n".join(body) + "\n")
+
+    return "\n".join(parts)
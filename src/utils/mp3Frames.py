@@ -0,0 +1,258 @@
+import mmap
+import struct
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+
+# Bitrates in kbps, indexed by the 4-bit bitrate field (0 = free format, 15 = invalid).
+BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+SAMPLE_RATES = {
+    1: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    2.5: [11025, 12000, 8000],
+}
+VERSION_BITS = {0b00: 2.5, 0b10: 2, 0b11: 1}
+LAYER_BITS = {0b01: 3, 0b10: 2, 0b11: 1}
+
+XING_FLAGS = 0x0001 | 0x0002  # frame count and byte count present
+
+
+class FrameHeader(NamedTuple):
+    raw: int
+    version: float
+    layer: int
+    bitrate_index: int
+    sample_rate: int
+    padding: int
+    channel_mode: int
+    length: int
+
+    @property
+    def samples(self) -> int:
+        if self.layer == 1:
+            return 384
+        if self.layer == 3 and self.version != 1:
+            return 576
+        return 1152
+
+    @property
+    def stream_format(self) -> Tuple:
+        """Fields that must match for two streams to be joined frame by frame."""
+        return (self.version, self.layer, self.sample_rate, self.channel_mode == 3)
+
+
+def frame_length(version: float, layer: int, bitrate: int, sample_rate: int, padding: int) -> int:
+    if layer == 1:
+        return (12 * bitrate * 1000 // sample_rate + padding) * 4
+    if layer == 3 and version != 1:
+        return 72 * bitrate * 1000 // sample_rate + padding
+    return 144 * bitrate * 1000 // sample_rate + padding
+
+
+def parse_header(raw: int) -> Optional[FrameHeader]:
+    """Decode a 32-bit frame header, or return None if it is not a valid one."""
+    if raw >> 21 != 0x7FF:
+        return None
+    version = VERSION_BITS.get((raw >> 19) & 0b11)
+    layer = LAYER_BITS.get((raw >> 17) & 0b11)
+    bitrate_index = (raw >> 12) & 0xF
+    sample_rate_index = (raw >> 10) & 0b11
+    if version is None or layer is None or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    bitrate = BITRATES[(1 if version == 1 else 2, layer)][bitrate_index]
+    sample_rate = SAMPLE_RATES[version][sample_rate_index]
+    padding = (raw >> 9) & 1
+    channel_mode = (raw >> 6) & 0b11
+    length = frame_length(version, layer, bitrate, sample_rate, padding)
+    return FrameHeader(raw, version, layer, bitrate_index, sample_rate, padding, channel_mode, length)
+
+
+def side_info_size(header: FrameHeader) -> int:
+    mono = header.channel_mode == 3
+    if header.version == 1:
+        return 17 if mono else 32
+    return 9 if mono else 17
+
+
+def is_info_frame(data, offset: int, header: FrameHeader) -> bool:
+    """True for the Xing/Info/VBRI metadata frame encoders put in front of the audio."""
+    if header.layer != 3:
+        return False
+    tag_at = offset + 4 + side_info_size(header)
+    if bytes(data[tag_at:tag_at + 4]) in (b'Xing', b'Info'):
+        return True
+    return bytes(data[offset + 36:offset + 40]) == b'VBRI'
+
+
+def audio_bounds(data) -> Tuple[int, int]:
+    """Start and end of the MPEG audio, excluding ID3v2/ID3v1 tags."""
+    start, end = 0, len(data)
+    if bytes(data[:3]) == b'ID3' and end >= 10:
+        size = 0
+        for byte in data[6:10]:
+            size = (size << 7) | (byte & 0x7F)
+        start = 10 + size + (10 if data[5] & 0x10 else 0)
+    if end - start >= 128 and bytes(data[end - 128:end - 125]) == b'TAG':
+        end -= 128
+    return start, end
+
+
+def iter_frames(data, start: int = 0, end: int = None):
+    """Yield (offset, header) for every audio frame, resyncing over junk bytes."""
+    end = len(data) if end is None else end
+    offset = start
+    while offset + 4 <= end:
+        header = parse_header(struct.unpack_from('>I', data, offset)[0])
+        if header is None or offset + header.length > end:
+            offset = data.find(b'\xff', offset + 1, end)
+            if offset < 0:
+                return
+            continue
+        yield offset, header
+        offset += header.length
+
+
+def read_audio_frames(data) -> Tuple[Optional[FrameHeader], List[Tuple[int, int]]]:
+    """
+    Return the first audio frame header and contiguous (start, end) byte runs of audio
+    frames, with tags and the leading Xing/Info frame left out.
+    """
+    start, end = audio_bounds(data)
+    first = None
+    runs: List[Tuple[int, int]] = []
+    for index, (offset, header) in enumerate(iter_frames(data, start, end)):
+        if index == 0 and is_info_frame(data, offset, header):
+            continue
+        if first is None:
+            first = header
+        elif header.stream_format != first.stream_format:
+            raise ValueError("MP3 stream changes format mid-file")
+        if runs and runs[-1][1] == offset:
+            runs[-1] = (runs[-1][0], offset + header.length)
+        else:
+            runs.append((offset, offset + header.length))
+    return first, runs
+
+
+def build_info_frame(template: FrameHeader, frame_count: int, byte_count: int, vbr: bool) -> bytes:
+    """
+    Build a Xing (VBR) or Info (CBR) frame matching `template`, carrying the total frame
+    and byte counts so players report the right duration and can seek.
+    """
+    needed = 4 + side_info_size(template) + 16
+    table = BITRATES[(1 if template.version == 1 else 2, template.layer)]
+    bitrate_index = template.bitrate_index
+    length = frame_length(template.version, template.layer, table[bitrate_index], template.sample_rate, 0)
+    if length < needed:
+        bitrate_index = next(
+            i for i in range(1, 15)
+            if frame_length(template.version, template.layer, table[i], template.sample_rate, 0) >= needed
+        )
+        length = frame_length(template.version, template.layer, table[bitrate_index], template.sample_rate, 0)
+
+    raw = template.raw
+    raw = (raw & ~(0xF << 12)) | (bitrate_index << 12)
+    raw &= ~(1 << 9)   # no padding
+    raw |= 1 << 16     # no CRC
+
+    frame = bytearray(length)
+    struct.pack_into('>I', frame, 0, raw)
+    tag_at = 4 + side_info_size(template)
+    frame[tag_at:tag_at + 4] = b'Xing' if vbr else b'Info'
+    struct.pack_into('>III', frame, tag_at + 4, XING_FLAGS, frame_count, byte_count)
+    return bytes(frame)
+
+
+class Mp3Writer:
+    """
+    Writes MP3 frames from several inputs into one file behind a single Xing/Info frame.
+    The metadata frame is reserved when the first input arrives and rewritten on close.
+    """
+
+    def __init__(self, output_path: str):
+        self.output_path = Path(output_path)
+        self._file = open(self.output_path, 'wb')
+        self.template: Optional[FrameHeader] = None
+        self.info_length = 0
+        self.frame_count = 0
+        self.audio_bytes = 0
+        self.bitrates = set()
+
+    def append(self, path: str):
+        with open(path, 'rb') as f:
+            if f.seek(0, 2) == 0:
+                raise ValueError(f"{path} is empty")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                first, runs = read_audio_frames(data)
+                if first is None:
+                    raise ValueError(f"{path} contains no MP3 frames")
+                if self.template is None:
+                    self.template = first
+                    placeholder = build_info_frame(first, 0, 0, vbr=False)
+                    self.info_length = len(placeholder)
+                    self._file.write(placeholder)
+                elif first.stream_format != self.template.stream_format:
+                    raise ValueError(f"{path} does not match the format of the first input")
+
+                for start, end in runs:
+                    for _, header in iter_frames(data, start, end):
+                        self.frame_count += 1
+                        self.bitrates.add(header.bitrate_index)
+                    self._file.write(data[start:end])
+                    self.audio_bytes += end - start
+
+    def close(self) -> int:
+        """Finalize the metadata frame; returns the number of audio frames written."""
+        if self.template is not None:
+            info = build_info_frame(
+                self.template,
+                self.frame_count,
+                self.info_length + self.audio_bytes,
+                vbr=len(self.bitrates) > 1,
+            )
+            self._file.seek(0)
+            self._file.write(info)
+        self._file.close()
+        return self.frame_count
+
+    def abort(self):
+        self._file.close()
+        self.output_path.unlink(missing_ok=True)
+
+
+def concat_mp3(inputs: Iterable[str], output_path: str) -> str:
+    """Join MP3 files frame by frame without re-encoding. Raises ValueError on mismatched inputs."""
+    writer = Mp3Writer(output_path)
+    try:
+        for path in inputs:
+            writer.append(path)
+    except Exception:
+        writer.abort()
+        raise
+    if writer.close() == 0:
+        Path(output_path).unlink(missing_ok=True)
+        raise ValueError("No MP3 frames to write")
+    return str(output_path)
+
+
+def duration_seconds(path: str) -> float:
+    """Playback length of an MP3 file computed from its frames."""
+    with open(path, 'rb') as f:
+        if f.seek(0, 2) == 0:
+            return 0.0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start, end = audio_bounds(data)
+            total = 0.0
+            for index, (offset, header) in enumerate(iter_frames(data, start, end)):
+                if index == 0 and is_info_frame(data, offset, header):
+                    continue
+                total += header.samples / header.sample_rate
+            return total
@@ -0,0 +1,134 @@
+import os
+import re
+import json
+import mmap
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from pypdf import PdfReader
+
+
+# "Section 683—High Level Lighting Systems" at the start of a line. Table of contents
+# entries (dot leaders or a trailing page number) are not treated as headings.
+SECTION_HEADING = re.compile(r"^Section\s+(\d+)\s*[—–-]\s*(\S.*?)\s*$", re.MULTILINE)
+TOC_ENTRY = re.compile(r"\.{3,}|\s\d+$")
+
+PAGES_PER_TASK = 20
+
+
+def _open_reader(f):
+    """PdfReader over a read-only memory map, so pages are paged in on demand."""
+    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return mm, PdfReader(mm)
+
+
+def page_count(pdf_path: str) -> int:
+    with open(pdf_path, "rb") as f:
+        mm, reader = _open_reader(f)
+        try:
+            return len(reader.pages)
+        finally:
+            del reader
+            mm.close()
+
+
+def extract_pages(args: Tuple[str, int, int]) -> List[Tuple[int, str]]:
+    """Worker: extract text of pages [start, end) as (1-based page number, text) pairs."""
+    pdf_path, start, end = args
+    with open(pdf_path, "rb") as f:
+        mm, reader = _open_reader(f)
+        try:
+            return [(i + 1, reader.pages[i].extract_text() or "") for i in range(start, end)]
+        finally:
+            del reader
+            mm.close()
+
+
+class ChunkBuilder:
+    """
+    Turns page text into standards.json records: one record per section per page,
+    each starting where the page (or the section heading) starts. Text before the
+    first section heading is front matter and is dropped.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.section = None
+        self.title = None
+
+    def _record(self, text: str, page_number: int) -> Dict:
+        return {
+            "section": self.section,
+            "title": self.title,
+            "content": text.strip(),
+            "source": self.source,
+            "page_number": page_number,
+        }
+
+    def feed(self, page_number: int, text: str) -> Iterator[Dict]:
+        position = 0
+        for match in SECTION_HEADING.finditer(text):
+            number, name = match.group(1), match.group(2)
+            if TOC_ENTRY.search(name) or self.section == f"Section {number}":
+                # TOC line, or a running page header repeating the current section
+                continue
+            before = text[position:match.start()]
+            if self.section and before.strip():
+                yield self._record(before, page_number)
+            self.section = f"Section {number}"
+            self.title = f"Section {number} — {name}"
+            position = match.start()
+
+        rest = text[position:]
+        if self.section and rest.strip():
+            yield self._record(rest, page_number)
+
+
+def iter_chunks(pdf_path: str, workers: int = None, pages_per_task: int = PAGES_PER_TASK) -> Iterator[Dict]:
+    """
+    Yield chunk records for a PDF in page order while pages are still being extracted.
+
+    Page ranges are extracted in a process pool; only a window of ranges a few times
+    the pool size is in flight, so memory stays bounded however long the document is.
+    """
+    workers = workers or os.cpu_count() or 1
+    total = page_count(pdf_path)
+    builder = ChunkBuilder(Path(pdf_path).name)
+    ranges = ((pdf_path, start, min(start + pages_per_task, total)) for start in range(0, total, pages_per_task))
+
+    # Spawned, not forked: this runs on job threads inside the web process, and forking a
+    # multithreaded process can deadlock the child on a lock held by another thread.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        in_flight = deque()
+        for args in ranges:
+            in_flight.append(pool.submit(extract_pages, args))
+            if len(in_flight) >= workers * 2:
+                for page_number, text in in_flight.popleft().result():
+                    yield from builder.feed(page_number, text)
+        while in_flight:
+            for page_number, text in in_flight.popleft().result():
+                yield from builder.feed(page_number, text)
+
+
+def write_standards_json(pdf_path: str, output_path: str, workers: int = None) -> int:
+    """Stream the chunks of a PDF into a standards.json-style array. Returns the chunk count."""
+    count = 0
+    tmp = f"{output_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("[")
+        for record in iter_chunks(pdf_path, workers=workers):
+            f.write(",\n    " if count else "\n    ")
+            f.write(json.dumps(record, ensure_ascii=False))
+            count += 1
+        f.write("\n]\n")
+    os.replace(tmp, output_path)
+    print(f"Extracted {count} chunks from {pdf_path} into {output_path}")
+    return count
+
+
+if __name__ == "__main__":
+    import sys
+    write_standards_json(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else "src/utils/standards.json")
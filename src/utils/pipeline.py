@@ -0,0 +1,395 @@
+import json
+import time
+import asyncio
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List
+
+from tracing import span, submit
+
+
+class Stage:
+    """A pipeline step: func receives the artifacts of its dependencies by stage name."""
+
+    def __init__(self, name: str, func: Callable[[Dict], object], deps: List[str] = ()):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+
+
+class Pipeline:
+    """
+    Runs stages as a dependency graph. A stage starts as soon as all of its
+    dependencies have finished, so independent stages overlap. Artifacts are
+    handed from stage to stage in memory.
+    """
+
+    def __init__(self, stages: List[Stage], max_workers: int = 4):
+        self.stages = {stage.name: stage for stage in stages}
+        self.max_workers = max_workers
+        for stage in stages:
+            missing = [d for d in stage.deps if d not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages {missing}")
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        order, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through stage {name}")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def run(self, report=None):
+        """
+        Execute the graph. Returns (artifacts, timings) where timings maps each stage
+        to its (start, end) offsets in seconds from the start of the run.
+        The first failing stage stops new stages from being scheduled and is re-raised.
+        """
+        report = report or (lambda stage, status: None)
+        artifacts: Dict[str, object] = {}
+        timings: Dict[str, tuple] = {}
+        lock = threading.Lock()
+        origin = time.perf_counter()
+
+        def execute(stage):
+            report(stage.name, "running")
+            started = time.perf_counter() - origin
+            try:
+                with lock:
+                    inputs = {dep: artifacts[dep] for dep in stage.deps}
+                with span(f"stage.{stage.name}"):
+                    result = stage.func(inputs)
+            except Exception:
+                report(stage.name, "failed")
+                raise
+            finally:
+                timings[stage.name] = (started, time.perf_counter() - origin)
+            with lock:
+                artifacts[stage.name] = result
+            report(stage.name, "done")
+            return result
+
+        pending = list(self.order)
+        running = {}
+        error = None
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage") as pool:
+            while pending or running:
+                if error is None:
+                    for name in list(pending):
+                        if all(dep in artifacts for dep in self.stages[name].deps):
+                            pending.remove(name)
+                            running[submit(pool, execute, self.stages[name])] = name
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    running.pop(future)
+                    if future.exception() is not None and error is None:
+                        error = future.exception()
+
+        if error is not None:
+            raise error
+        return artifacts, timings
+
+    def critical_path(self, timings: Dict[str, tuple]):
+        """Longest chain of dependent stages by duration: the stages that set the total run time."""
+        best = {}
+        for name in self.order:
+            if name not in timings:
+                continue
+            duration = timings[name][1] - timings[name][0]
+            prior = max(
+                (best[dep] for dep in self.stages[name].deps if dep in best),
+                key=lambda item: item[0],
+                default=(0.0, []),
+            )
+            best[name] = (prior[0] + duration, prior[1] + [name])
+        if not best:
+            return 0.0, []
+        return max(best.values(), key=lambda item: item[0])
+
+    def print_summary(self, timings: Dict[str, tuple]):
+        wall = max(end for _, end in timings.values()) if timings else 0.0
+        total, path = self.critical_path(timings)
+        print("=" * 70)
+        print(f"Pipeline finished in {wall:.1f}s")
+        for name in self.order:
+            if name in timings:
+                start, end = timings[name]
+                print(f"   {name:14s} {start:7.1f}s -> {end:7.1f}s  ({end - start:.1f}s)")
+        print(f"Critical path ({total:.1f}s): {' -> '.join(path)}")
+        print("=" * 70)
+
+
+def build_pipeline(input_path: str, job_id: str = "default", settings=None, report=None, on_final=None,
+                   workspace=None) -> Pipeline:
+    """
+    Stage graph for one input file:
+
+        ingest -> narration -> images
+                            -> tts -> manim_script -> render
+
+    Image search and TTS only depend on the narration and run together. Narration is
+    streamed, and each narration starts its TTS clip and image searches as soon as it is
+    parsed, so those stages mostly find their work already done. Each scene is timed to
+    the length of its narration clip, and the render stage muxes the narration into the
+    final video in the same stream-copy pass that joins the scenes.
+
+    Every chunk is fingerprinted and its narration, images and audio clip are recorded in
+    the build state under that fingerprint, so a rerun after a small edit only recomputes
+    the changed chunks and then re-assembles the merged audio and final video. Scene clips
+    are not in the build state: they come from the render cache, which is keyed by the
+    timed scene source and render flags.
+
+    `settings` are the per-job render settings (see manimGenerator.render_settings). With
+    preview on, the render stage returns a 480p preview and queues the full-quality render
+    in the background; report("final_render", ...) follows its progress and on_final(path)
+    is called with the full-quality video (None if it failed).
+
+    Scripts, merged audio, render media and the video are written to the job's workspace
+    (see workspace.Workspace), so pipelines for different jobs can run at the same time.
+    A stage that leaves the workspace over its quota fails the job; the render checks the
+    quota itself, before and after each render, so an over-quota full-quality render is
+    skipped or discarded and reported to on_final as failed.
+    """
+    # Imported here so callers that only schedule jobs do not load the whole stack.
+    import generateImages
+    from buildState import BuildState, fingerprint
+    from inputToNarration import narrate_chunks_async, fill_defaults
+    from manimGenerator import (
+        generate_manim_script_from_data, render_scenes, concat_videos, render_two_tier, PREVIEW_QUALITY,
+        SECTION_SCENE_PREFIX
+    )
+    from mp3Frames import concat_mp3, duration_seconds
+    from pdfIngest import iter_chunks
+    from tts import EdgeTTSNarrationGenerator
+    from workspace import Workspace
+
+    report = report or (lambda stage, status: None)
+    state = BuildState()
+    workspace = workspace or Workspace(job_id)
+    script_dir = workspace.dir("scripts")
+    audio_dir = workspace.dir("audio")
+    render_dir = workspace.dir("render")
+    video_dir = workspace.dir("video")
+
+    def ingest(_):
+        suffix = Path(input_path).suffix.lower()
+        if suffix == ".json":
+            with open(input_path, "r", encoding="utf-8") as f:
+                chunks = json.load(f)
+        elif suffix == ".pdf":
+            chunks = list(iter_chunks(input_path))
+        else:
+            raise ValueError(f"Unsupported input type: {input_path}")
+        return [dict(chunk, fingerprint=fingerprint(chunk)) for chunk in chunks]
+
+    async def narrate_with_prefetch(dirty):
+        """
+        Narrate the changed chunks, starting TTS and image search for each narration as
+        soon as it is streamed. The clips land in the audio store and the URLs in the
+        search cache, so the tts and images stages find them ready.
+        """
+        generator = EdgeTTSNarrationGenerator(work_dir=str(audio_dir))
+        cache = generateImages.load_search_cache()
+        prefetch = []
+
+        async with generateImages.open_search_session() as session:
+            # One searcher for the whole job, so entries sharing a query search it once.
+            searcher = generateImages.ImageSearcher(session, cache)
+
+            def on_result(index, entry):
+                prefetch.append(asyncio.ensure_future(generator.generate_audio_async(
+                    entry["narration_script"], index, entry.get("section", ""), entry.get("title", "")
+                )))
+                queries = [generateImages.build_google_query(k) for k in entry.get("images", [])]
+                prefetch.append(asyncio.ensure_future(searcher.search(queries)))
+
+            data = await narrate_chunks_async(dirty, on_result=on_result)
+            outcomes = await asyncio.gather(*prefetch, return_exceptions=True)
+
+        generateImages.save_search_cache(cache)
+        failed = sum(1 for o in outcomes if isinstance(o, Exception))
+        if failed:
+            print(f"Prefetch: {failed} of {len(outcomes)} tasks failed; their stages will retry")
+        return data
+
+    def narration(inputs):
+        chunks = inputs["ingest"]
+        cached = [state.get(c["fingerprint"], "narration") for c in chunks]
+        dirty = [
+            {k: v for k, v in c.items() if k != "fingerprint"}
+            for c, hit in zip(chunks, cached) if hit is None
+        ]
+        print(f"Narration: {len(dirty)} of {len(chunks)} chunks changed")
+        fresh = iter(asyncio.run(narrate_with_prefetch(dirty))["results"] if dirty else [])
+
+        results = []
+        for chunk, hit in zip(chunks, cached):
+            entry = dict(hit if hit is not None else next(fresh), fingerprint=chunk["fingerprint"])
+            # Narrations stored before entries carried their source and page get them here.
+            fill_defaults(entry, chunk)
+            if entry.get("narration_script"):
+                state.set(chunk["fingerprint"], "narration", {k: v for k, v in entry.items() if k != "fingerprint"})
+            results.append(entry)
+        state.save()
+        return {"results": results}
+
+    def images(inputs):
+        entries = inputs["narration"]["results"]
+        cached = [state.get(e["fingerprint"], "images") for e in entries]
+        # A hit whose files were evicted by generateImages.cleanup_images is downloaded again.
+        cached = [hit if hit is not None and all(
+            not image.get("path") or (Path(generateImages.BASE) / image["path"]).exists() for image in hit
+        ) else None for hit in cached]
+        dirty = [e for e, hit in zip(entries, cached) if hit is None]
+        # Images live in the shared generateImages.IMAGES_DIR and their results are shared
+        # through the build state, so paths stay relative to src/utils, not to the workspace.
+        fresh = iter(asyncio.run(generateImages.attach_images({"results": dirty}))["results"] if dirty else [])
+
+        results = []
+        for entry, hit in zip(entries, cached):
+            images = hit if hit is not None else next(fresh)["images"]
+            # Like the search cache, only record hits, so failed searches are retried next run.
+            if hit is None and (not images or any(image.get("url") for image in images)):
+                state.set(entry["fingerprint"], "images", images)
+            results.append(dict(entry, images=images))
+        state.save()
+        return {"results": results}
+
+    def tts(inputs):
+        entries = inputs["narration"]["results"]
+        generator = EdgeTTSNarrationGenerator(work_dir=str(audio_dir))
+        # Unchanged narrations are audio store hits, so only changed chunks reach edge-tts.
+        audio_files, merged = generator.process_narrations(entries, job_id)
+        for index, path in zip(generator.last_chunk_indices, audio_files):
+            state.set(entries[index]["fingerprint"], "audio", path)
+        state.save()
+        return {"files": audio_files, "merged": merged, "by_chunk": dict(zip(generator.last_chunk_indices, audio_files))}
+
+    def manim_script(inputs):
+        entries = inputs["narration"]["results"]
+        audio = inputs["tts"]["by_chunk"]
+        silent = [i for i, e in enumerate(entries) if e.get("narration_script") and i not in audio]
+        if silent:
+            print(f"Scenes: chunks {silent} have no audio and are left out of the video")
+
+        def script_for(index, entry):
+            if not entry.get("narration_script") or index not in audio:
+                return None
+            timed = dict(entry, audio_duration=round(duration_seconds(audio[index]), 3))
+            payload = {"results": [{k: v for k, v in timed.items() if k != "fingerprint"}]}
+            return generate_manim_script_from_data(
+                payload, output_dir=str(script_dir / entry["fingerprint"][:16]), per_section=True
+            )
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [submit(pool, script_for, i, entry) for i, entry in enumerate(entries)]
+            return [future.result() for future in futures]
+
+    def render(inputs):
+        scripts = inputs["manim_script"]
+        audio = inputs["tts"]["by_chunk"]
+        todo = [i for i, script in enumerate(scripts) if script]
+
+        def render_at(flags):
+            preview = PREVIEW_QUALITY in flags
+            # Also run for the background final render, which is skipped once the job is over quota.
+            workspace.check_quota()
+            # Unchanged scenes are render cache hits, so only changed chunks reach manim.
+            rendered = render_scenes([(scripts[i], f"{SECTION_SCENE_PREFIX}000") for i in todo], str(render_dir), flags)
+            kept = [(i, clip) for i, clip in zip(todo, rendered) if clip is not None]
+            if not kept:
+                raise RuntimeError("No scenes rendered")
+            # The soundtrack holds exactly the clips of the scenes that made it into the video.
+            suffix = "_preview" if preview else ""
+            soundtrack = video_dir / f"narration_{job_id}{suffix}.mp3"
+            concat_mp3([audio[i] for i, _ in kept], str(soundtrack))
+            try:
+                output = video_dir / f"Explainer_{job_id}{suffix}.mp4"
+                concat_videos([clip for _, clip in kept], output, soundtrack)
+            finally:
+                soundtrack.unlink(missing_ok=True)
+            try:
+                workspace.check_quota()
+            except Exception:
+                output.unlink(missing_ok=True)
+                raise
+            return str(output)
+
+        def finished(path):
+            report("final_render", "done" if path else "failed")
+            if on_final:
+                on_final(path)
+
+        video, final = render_two_tier(render_at, settings, finished)
+        if final is not None:
+            report("final_render", "running")
+        return {"video": video, "quality": "preview" if final is not None else "final", "final": final}
+
+    def within_quota(func):
+        def run(inputs):
+            result = func(inputs)
+            workspace.check_quota()
+            return result
+        return run
+
+    return Pipeline([
+        Stage("ingest", ingest),
+        Stage("narration", narration, ["ingest"]),
+        Stage("images", images, ["narration"]),
+        Stage("tts", within_quota(tts), ["narration"]),
+        Stage("manim_script", within_quota(manim_script), ["narration", "tts"]),
+        Stage("render", render, ["manim_script", "tts"]),
+    ])
+
+
+STAGES = ["ingest", "narration", "images", "tts", "manim_script", "render"]
+
+
+def run_pipeline(input_path: str, job_id: str = "default", report=None, settings=None, on_final=None, workspace=None):
+    """
+    Run every stage for one input file and return a summary of what it produced.
+
+    Args:
+        input_path: Chunk JSON in the standards.json format, or a PDF to ingest first.
+        job_id: Used to tag the audio this run references and to name its workspace.
+        report: Optional callback report(stage, status) called with "running",
+                "done" or "failed" as each stage progresses.
+        settings: Render settings (resolution, fps, preview); see manimGenerator.render_settings.
+        on_final: With preview on, called with the full-quality video path once its
+                  background render finishes (None if it failed). The summary's "video"
+                  is the preview until then.
+        workspace: Directory for this run's files; defaults to Workspace(job_id).
+    """
+    pipeline = build_pipeline(input_path, job_id, settings, report, on_final, workspace)
+    artifacts, timings = pipeline.run(report)
+    pipeline.print_summary(timings)
+
+    total, path = pipeline.critical_path(timings)
+    return {
+        "chunks": len(artifacts["ingest"]),
+        "narrations": len(artifacts["narration"].get("results", [])),
+        "images": artifacts["images"].get("results", []),
+        "audio_files": artifacts["tts"]["files"],
+        "audio": artifacts["tts"]["merged"],
+        "manim_scripts": artifacts["manim_script"],
+        "video": artifacts["render"]["video"],
+        "video_quality": artifacts["render"]["quality"],
+        "timings": {name: {"start": s, "end": e} for name, (s, e) in timings.items()},
+        "critical_path": {"seconds": total, "stages": path},
+    }
@@ -0,0 +1,67 @@
+import math
+import random
+import asyncio
+from collections import deque
+
+
+class AdaptiveLimiter:
+    """
+    Async concurrency limiter that backs off when errors rise (AIMD).
+
+    At most `limit` holders run at once. When the error rate over the last `window`
+    outcomes goes above `error_threshold` the limit is halved; every `limit`
+    consecutive successes raise it by one again, up to `max_concurrency`.
+    """
+
+    def __init__(self, max_concurrency: int, min_concurrency: int = 1,
+                 window: int = 20, error_threshold: float = 0.2):
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = self.max_concurrency
+        self.error_threshold = error_threshold
+        self._outcomes = deque(maxlen=window)
+        self._successes = 0
+        self._active = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+        return False
+
+    def record(self, success: bool):
+        self._outcomes.append(success)
+        if success:
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.max_concurrency:
+                self.limit += 1
+                self._successes = 0
+            return
+
+        self._successes = 0
+        errors = self._outcomes.count(False)
+        if errors / len(self._outcomes) > self.error_threshold and self.limit > self.min_concurrency:
+            self.limit = max(self.min_concurrency, self.limit // 2)
+            self._outcomes.clear()
+            print(f"   Error rate rising, concurrency lowered to {self.limit}")
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct * len(ordered) / 100))
+    return ordered[min(rank, len(ordered)) - 1]
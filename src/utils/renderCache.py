@@ -0,0 +1,116 @@
+import ast
+import os
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from importlib import metadata
+
+
+DEFAULT_CACHE_DIR = "src/static/outputs/cache/render"
+DEFAULT_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+
+
+def manim_version() -> str:
+    """Installed Manim version, part of every cache key so upgrades invalidate old clips."""
+    try:
+        return metadata.version("manim")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def scene_source(script_path: str, scene_name: str) -> str:
+    """
+    Source that determines how `scene_name` renders: the scene class itself plus every
+    module-level statement that is not another scene class (imports, helpers, constants).
+    """
+    with open(script_path, "r", encoding="utf-8") as f:
+        source = f.read()
+    tree = ast.parse(source, filename=script_path)
+
+    parts = []
+    found = False
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            if node.name == scene_name:
+                found = True
+            elif any(isinstance(b, ast.Name) and b.id.endswith("Scene") for b in node.bases):
+                continue
+        parts.append(ast.get_source_segment(source, node) or "")
+
+    if not found:
+        raise ValueError(f"Scene {scene_name} not found in {script_path}")
+    return "\n".join(parts)
+
+
+class RenderCache:
+    """Content-addressed store of rendered clips with size-based LRU eviction."""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def key_for(self, source: str, quality_flags, version: str = None) -> str:
+        if isinstance(quality_flags, str):
+            quality_flags = [quality_flags]
+        digest = hashlib.sha256()
+        digest.update(source.encode("utf-8"))
+        digest.update(b"\0" + " ".join(quality_flags).encode("utf-8"))
+        digest.update(b"\0" + (version or manim_version()).encode("utf-8"))
+        return digest.hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.mp4"
+
+    def get(self, key: str):
+        """Return the cached clip for `key`, or None. A hit refreshes its LRU stamp."""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, video_path) -> Path:
+        """Copy a freshly rendered clip into the cache and evict old entries if needed."""
+        target = self.path_for(key)
+        tmp = target.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        shutil.copyfile(video_path, tmp)
+        os.replace(tmp, target)
+        self.evict()
+        return target
+
+    def evict(self):
+        """Drop least recently used clips until the cache fits in max_bytes."""
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.cache_dir.glob("*.mp4"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+
+_default_cache = None
+
+
+def get_render_cache() -> RenderCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = RenderCache()
+    return _default_cache
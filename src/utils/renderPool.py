@@ -0,0 +1,204 @@
+import os
+import shutil
+import hashlib
+import tempfile
+import threading
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import List
+
+
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", os.cpu_count() or 1))
+
+# manim CLI quality flags and the config preset each one selects
+QUALITY_PRESETS = {
+    "-ql": "low_quality",
+    "-qm": "medium_quality",
+    "-qh": "high_quality",
+    "-qp": "production_quality",
+    "-qk": "fourk_quality",
+}
+
+
+def config_for(flags: List[str], media_dir: str) -> dict:
+    """
+    Translate the CLI flags render_section uses into a manim config for tempconfig.
+    The quality preset is expanded into explicit pixel sizes and frame rate rather than
+    passed as "quality": ManimConfig.update applies properties such as quality after the
+    plain keys, so a preset would overwrite the -r and --fps values.
+    """
+    from manim.constants import QUALITIES
+
+    preset = "high_quality"
+    extra = {}
+    i = 0
+    while i < len(flags):
+        flag = flags[i]
+        if flag in QUALITY_PRESETS:
+            preset = QUALITY_PRESETS[flag]
+        elif flag == "-r":
+            width, height = flags[i + 1].split(",")
+            extra["pixel_width"], extra["pixel_height"] = int(width), int(height)
+            i += 1
+        elif flag == "--fps":
+            extra["frame_rate"] = float(flags[i + 1])
+            i += 1
+        else:
+            raise ValueError(f"Unsupported render flag for the renderer pool: {flag}")
+        i += 1
+    options = {key: QUALITIES[preset][key] for key in ("pixel_width", "pixel_height", "frame_rate")}
+    options.update(extra)
+    options.update({"media_dir": media_dir, "write_to_movie": True, "preview": False})
+    return options
+
+
+def _warm_up():
+    """Worker initializer: pay for the manim, numpy and cairo/pango imports once per process."""
+    from manim import config, Text
+
+    config.progress_bar = "none"
+    config.verbosity = "WARNING"
+    try:
+        # First use of Text loads the font map
+        Text("warm up")
+    except Exception:
+        pass
+
+
+def _load_scene_module(script_path: str):
+    path = Path(script_path).resolve()
+    # A fresh module per script version, so an edited script is never served stale.
+    tag = hashlib.sha1(f"{path}:{path.stat().st_mtime_ns}".encode("utf-8")).hexdigest()[:12]
+    spec = importlib.util.spec_from_file_location(f"manim_scene_{tag}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def render_scene(script_path: str, scene_name: str, media_dir: str, flags: List[str]) -> str:
+    """
+    Worker: render one scene through the Manim API and return the movie path.
+    tempconfig restores the process-wide config afterwards, so renders for different jobs
+    never see each other's media_dir, quality or frame rate.
+    """
+    from manim import tempconfig
+
+    module = _load_scene_module(script_path)
+    scene_cls = getattr(module, scene_name)
+    with tempconfig(config_for(flags, media_dir)):
+        scene = scene_cls()
+        scene.render()
+        return str(scene.renderer.file_writer.movie_file_path)
+
+
+def dry_run_scene(script_path: str, scene_name: str, margin: float = 0.25) -> dict:
+    """
+    Worker: play a scene with animations skipped and nothing written, to catch exceptions
+    and mobjects left outside the frame before any frame is rendered.
+
+    Returns:
+        {"problems": [...], "duration_s": scene length in seconds (None if it raised)}
+    """
+    from manim import tempconfig, config
+
+    problems = []
+    media_dir = tempfile.mkdtemp(prefix="dry_run_")
+    try:
+        module = _load_scene_module(script_path)
+        scene_cls = getattr(module, scene_name)
+        with tempconfig({"dry_run": True, "media_dir": media_dir, "disable_caching": True}):
+            scene = scene_cls(skip_animations=True)
+            half_w = config.frame_width / 2 + margin
+            half_h = config.frame_height / 2 + margin
+            reported = set()
+
+            def check_frame():
+                for mob in scene.mobjects:
+                    if id(mob) in reported or (mob.width == 0 and mob.height == 0):
+                        continue
+                    if mob.get_right()[0] > half_w or mob.get_left()[0] < -half_w \
+                            or mob.get_top()[1] > half_h or mob.get_bottom()[1] < -half_h:
+                        reported.add(id(mob))
+                        problems.append(
+                            f"{type(mob).__name__} runs off screen at t={scene.renderer.time:.1f}s"
+                        )
+
+            play, wait = scene.play, scene.wait
+
+            def checked_play(*args, **kwargs):
+                play(*args, **kwargs)
+                check_frame()
+
+            def checked_wait(*args, **kwargs):
+                wait(*args, **kwargs)
+                check_frame()
+
+            scene.play, scene.wait = checked_play, checked_wait
+            scene.render()
+            return {"problems": problems, "duration_s": round(scene.renderer.time, 3)}
+    except Exception as e:
+        return {"problems": problems + [f"{type(e).__name__}: {e}"], "duration_s": None}
+    finally:
+        shutil.rmtree(media_dir, ignore_errors=True)
+
+
+class RenderPool:
+    """
+    Long-lived renderer processes. Each worker imports manim once and then renders any
+    number of scenes in-process, instead of starting a fresh `manim` CLI per scene.
+    Workers are spawned rather than forked so they do not inherit the server's threads.
+    """
+
+    def __init__(self, max_workers: int = RENDER_WORKERS):
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_up,
+                )
+            return self._executor
+
+    def render(self, script_path: str, scene_name: str, media_dir: str, flags: List[str]) -> str:
+        return self._call(render_scene, str(script_path), scene_name, str(media_dir), list(flags))
+
+    def dry_run(self, script_path: str, scene_name: str) -> dict:
+        return self._call(dry_run_scene, str(script_path), scene_name)
+
+    def _call(self, fn, *args):
+        pool = self._pool()
+        try:
+            return pool.submit(fn, *args).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a fresh pool for the next render.
+            with self._lock:
+                if self._executor is pool:
+                    self._executor = None
+            pool.shutdown(wait=False)
+            raise
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> RenderPool:
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = RenderPool()
+        return _render_pool
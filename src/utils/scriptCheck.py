@@ -0,0 +1,219 @@
+import ast
+import math
+import builtins
+from typing import Dict, List, Set
+
+
+# Modules a scene script may import (not their submodules).
+ALLOWED_IMPORTS = {"manim", "numpy", "math", "random"}
+
+# Manim classes and functions a script may call by name.
+MANIM_CALLS = {
+    # mobjects
+    "Text", "MarkupText", "Paragraph", "Tex", "MathTex", "Title", "BulletedList",
+    "VGroup", "Group", "VMobject", "Mobject",
+    "Rectangle", "RoundedRectangle", "Square", "Circle", "Ellipse", "Dot", "Annulus", "Sector",
+    "Arc", "Line", "DashedLine", "Arrow", "DoubleArrow", "CurvedArrow", "Vector", "Polygon",
+    "RegularPolygon", "Triangle", "Star", "Brace", "BraceLabel", "BraceBetweenPoints",
+    "SurroundingRectangle", "BackgroundRectangle", "Underline", "Cross",
+    "Table", "MathTable", "IntegerTable", "DecimalTable", "NumberLine", "Axes", "NumberPlane",
+    "BarChart", "DecimalNumber", "Integer", "Variable", "ValueTracker",
+    # animations
+    "FadeIn", "FadeOut", "FadeTransform", "Write", "Unwrite", "Create", "Uncreate",
+    "DrawBorderThenFill", "GrowArrow", "GrowFromCenter", "GrowFromEdge", "GrowFromPoint",
+    "SpinInFromNothing", "Transform", "ReplacementTransform", "TransformMatchingShapes",
+    "TransformMatchingTex", "TransformFromCopy", "MoveToTarget", "ApplyMethod", "Rotate",
+    "Rotating", "ScaleInPlace", "Indicate", "Circumscribe", "Flash", "Wiggle", "FocusOn",
+    "ShowPassingFlash", "AnimationGroup", "LaggedStart", "LaggedStartMap", "Succession", "Wait",
+    # helpers
+    "always_redraw", "interpolate_color", "color_gradient", "rgb_to_color", "ManimColor",
+    "tempconfig",
+}
+
+# Modules `from manim import *` brings in under these names; they go through the same
+# attribute allowlist as an explicit import. Any other module it re-exports is rejected
+# like every other name the script does not define.
+STAR_IMPORT_MODULES = {"manim": {"np": "numpy"}}
+
+# Non-callable manim names a script may read, e.g. rate_func=smooth.
+MANIM_VALUES = {
+    "config", "Scene", "MovingCameraScene", "ThreeDScene",
+    "smooth", "linear", "rush_into", "rush_from", "there_and_back", "double_smooth", "lingering",
+}
+
+# Attributes a script may use through each allowed module, e.g. np.linspace or random.uniform.
+# manim also allows its upper-case constants (colours, directions); see _module_attribute_allowed.
+MODULE_ATTRIBUTES = {
+    "manim": MANIM_CALLS | MANIM_VALUES,
+    "numpy": {
+        "array", "linspace", "arange", "zeros", "ones", "sin", "cos", "tan", "arcsin", "arccos",
+        "arctan", "arctan2", "sqrt", "exp", "log", "abs", "clip", "interp", "dot", "cross", "mean",
+        "min", "max", "sum", "round", "floor", "ceil", "pi", "e", "deg2rad", "rad2deg",
+        "linalg.norm", "random.rand", "random.uniform", "random.randint", "random.random",
+        "random.choice", "random.seed",
+    },
+    "math": {name for name in dir(math) if not name.startswith("_")},
+    "random": {"random", "uniform", "randint", "choice", "seed", "shuffle", "sample"},
+}
+
+# Never reachable from a scene, whatever the path to them.
+DANGEROUS_NAMES = {"os", "sys", "subprocess", "shutil", "socket", "importlib", "builtins", "pathlib", "system", "popen"}
+
+# Methods a scene may call on itself.
+SCENE_METHODS = {
+    "play", "wait", "add", "remove", "clear", "bring_to_front", "bring_to_back",
+    "add_foreground_mobject", "add_foreground_mobjects", "remove_foreground_mobject",
+    "next_section", "wait_until", "construct", "render", "setup", "tear_down",
+}
+
+SAFE_BUILTINS = {
+    "len", "range", "enumerate", "zip", "min", "max", "abs", "round", "int", "float", "str",
+    "list", "dict", "tuple", "set", "bool", "isinstance", "hasattr", "sorted", "reversed",
+    "sum", "any", "all", "map", "filter", "print", "super",
+}
+
+# Exceptions a scene may raise or catch.
+ALLOWED_EXCEPTIONS = {"Exception", "ValueError", "TypeError", "IndexError", "KeyError"}
+
+# Nothing in a scene has a reason to touch these.
+FORBIDDEN_NAMES = set(dir(builtins)) - SAFE_BUILTINS - ALLOWED_EXCEPTIONS - {"True", "False", "None", "__name__"}
+
+
+def _defined_names(tree: ast.AST) -> Set[str]:
+    """Every name the script itself binds: functions, classes, variables and parameters."""
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            names.add(node.id)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, ast.alias):
+            names.add((node.asname or node.name).split(".")[0])
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+    return names
+
+
+def _module_aliases(tree: ast.AST) -> Dict[str, str]:
+    """
+    Names bound by `import x` / `import x as y`, or by a star import that re-exports
+    modules (np from manim), mapped to the module they stand for.
+    """
+    aliases = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                module = alias.name.split(".")[0]
+                aliases[alias.asname or module] = module
+        elif isinstance(node, ast.ImportFrom) and any(alias.name == "*" for alias in node.names):
+            aliases.update(STAR_IMPORT_MODULES.get(node.module, {}))
+    return aliases
+
+
+def _attribute_chain(node: ast.Attribute):
+    """For a.b.c return ("a", "b.c"); the root is None when the chain does not start at a name."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    root = node.id if isinstance(node, ast.Name) else None
+    return root, ".".join(reversed(parts))
+
+
+def _module_attribute_allowed(module: str, path: str) -> bool:
+    if path in MODULE_ATTRIBUTES.get(module, ()):
+        return True
+    if module != "manim":
+        return False
+    # Upper-case constants such as BLUE or UP, and reading config values
+    return ("." not in path and path.isupper()) or path.split(".")[0] == "config"
+
+
+def _name_allowed(name: str, defined: Set[str]) -> bool:
+    """Whether a script may read a bare name it did not import as a module."""
+    return (name in defined or name in MANIM_CALLS or name in MANIM_VALUES or name in SAFE_BUILTINS
+            or name in ALLOWED_EXCEPTIONS or name == "__name__" or name.isupper())
+
+
+def check_source(source: str, scene_names: List[str]) -> List[str]:
+    """
+    Static check of a scene script against the allowlist. Returns the problems found;
+    an empty list means the script may go on to the dry run.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as e:
+        return [f"syntax error at line {e.lineno}: {e.msg}"]
+
+    problems = []
+    defined = _defined_names(tree)
+    modules = _module_aliases(tree)
+    # Attributes and names that are the `value` of an attribute access, so only whole chains are checked.
+    chain_parts = {id(node.value) for node in ast.walk(tree) if isinstance(node, ast.Attribute)}
+    classes = {node.name for node in tree.body if isinstance(node, ast.ClassDef)}
+    problems += [f"scene {name} is not defined" for name in scene_names if name not in classes]
+
+    for node in ast.walk(tree):
+        line = getattr(node, "lineno", "?")
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name not in ALLOWED_IMPORTS:
+                    problems.append(f"line {line}: import of {alias.name} is not allowed")
+        elif isinstance(node, ast.ImportFrom):
+            if node.module not in ALLOWED_IMPORTS:
+                problems.append(f"line {line}: import from {node.module} is not allowed")
+            for alias in node.names:
+                if alias.name != "*" and not _module_attribute_allowed(node.module, alias.name):
+                    problems.append(f"line {line}: import of {alias.name} from {node.module} is not allowed")
+        elif isinstance(node, ast.Attribute):
+            if node.attr in DANGEROUS_NAMES:
+                problems.append(f"line {line}: access to {node.attr} is not allowed")
+            elif node.attr.startswith("__") and node.attr != "__init__":
+                problems.append(f"line {line}: access to {node.attr} is not allowed")
+            elif id(node) not in chain_parts:
+                root, path = _attribute_chain(node)
+                if root in modules and not _module_attribute_allowed(modules[root], path):
+                    problems.append(f"line {line}: {root}.{path} is not an allowed {modules[root]} API")
+        elif isinstance(node, ast.Name):
+            if node.id in DANGEROUS_NAMES:
+                problems.append(f"line {line}: use of {node.id} is not allowed")
+            elif node.id in FORBIDDEN_NAMES and node.id not in defined:
+                problems.append(f"line {line}: use of {node.id} is not allowed")
+            elif not isinstance(node.ctx, ast.Load):
+                continue
+            elif node.id in modules:
+                if id(node) not in chain_parts:
+                    # A module passed around as a value could reach anything through it.
+                    problems.append(f"line {line}: module {node.id} may only be used through its allowed attributes")
+            elif not _name_allowed(node.id, defined):
+                # Every read is checked, not only calls, so `run = capture; run(...)` is caught at `capture`.
+                problems.append(f"line {line}: {node.id} is not an allowed Manim API")
+        elif isinstance(node, ast.Call):
+            func = node.func
+            if (isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name)
+                    and func.value.id in ("self", "scene") and func.attr not in SCENE_METHODS):
+                problems.append(f"line {line}: {func.value.id}.{func.attr}() is not an allowed Scene method")
+    return problems
+
+
+def check_script(script_path: str, scene_names: List[str]) -> List[str]:
+    with open(script_path, "r", encoding="utf-8") as f:
+        return check_source(f.read(), scene_names)
+
+
+def validate_scene(script_path: str, scene_name: str, dry_run) -> Dict:
+    """
+    Pre-render gate for one scene: the static check, then dry_run(script_path, scene_name)
+    (see renderPool.dry_run_scene), which plays the scene with animations skipped.
+
+    Returns:
+        {"ok": bool, "problems": [...], "duration_s": estimated length or None}
+    """
+    problems = check_script(script_path, [scene_name])
+    if problems:
+        return {"ok": False, "problems": problems, "duration_s": None}
+
+    result = dry_run(script_path, scene_name)
+    return {"ok": not result["problems"], "problems": result["problems"], "duration_s": result["duration_s"]}
@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+# Numeric span attributes that are also summed into Prometheus counters.
+COUNTED_ATTRS = ("bytes", "prompt_tokens", "completion_tokens", "retries", "cache_hits")
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+class Span:
+    """One timed operation. Attributes hold counts such as bytes, tokens and retries."""
+
+    def __init__(self, name: str, trace_id: Optional[str], parent_id: Optional[str], attrs: Dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attrs = dict(attrs)
+        self.status = "ok"
+        self.error = None
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration = None
+        self._lock = threading.Lock()
+
+    def set(self, **attrs):
+        with self._lock:
+            self.attrs.update(attrs)
+
+    def fail(self, error: str):
+        """Mark a failure that was handled inside the span, so it still counts as an error."""
+        with self._lock:
+            self.status = "error"
+            self.error = error
+
+    def incr(self, key: str, amount: float = 1):
+        with self._lock:
+            self.attrs[key] = self.attrs.get(key, 0) + amount
+
+    def to_dict(self) -> Dict:
+        # Copied under the lock: spans still running keep updating their attrs while a trace is exported.
+        with self._lock:
+            return {
+                "name": self.name,
+                "trace_id": self.trace_id,
+                "span_id": self.span_id,
+                "parent_id": self.parent_id,
+                "start": self.start,
+                "duration_s": self.duration,
+                "status": self.status,
+                "error": self.error,
+                "attrs": dict(self.attrs),
+            }
+
+
+class Trace:
+    """Collects the spans of one job so they can be exported as JSON."""
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            spans = [s.to_dict() for s in sorted(self.spans, key=lambda s: s.start)]
+        return {"trace_id": self.trace_id, "spans": spans}
+
+    def export(self, path: str):
+        """Write the trace to `path` atomically, so a reader never sees a half-written file."""
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, indent=2, default=str)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+
+class Metrics:
+    """Process-wide aggregates of finished spans, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations: Dict[str, Dict] = {}
+        self._counters: Dict[tuple, float] = {}
+
+    def observe(self, span: Span):
+        with self._lock:
+            hist = self._durations.setdefault(
+                span.name, {"buckets": [0] * len(DURATION_BUCKETS), "sum": 0.0, "count": 0}
+            )
+            hist["sum"] += span.duration
+            hist["count"] += 1
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if span.duration <= bound:
+                    hist["buckets"][i] += 1
+
+            if span.status != "ok":
+                key = ("errors", span.name)
+                self._counters[key] = self._counters.get(key, 0) + 1
+            for attr in COUNTED_ATTRS:
+                value = span.attrs.get(attr)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    key = (attr, span.name)
+                    self._counters[key] = self._counters.get(key, 0) + value
+
+    def render(self) -> str:
+        lines = [
+            "# HELP infographics_span_duration_seconds Duration of instrumented operations.",
+            "# TYPE infographics_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            for name, hist in sorted(self._durations.items()):
+                for bound, count in zip(DURATION_BUCKETS, hist["buckets"]):
+                    lines.append(f'infographics_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+                lines.append(f'infographics_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {hist["count"]}')
+                lines.append(f'infographics_span_duration_seconds_sum{{span="{name}"}} {hist["sum"]:.6f}')
+                lines.append(f'infographics_span_duration_seconds_count{{span="{name}"}} {hist["count"]}')
+
+            for attr in COUNTED_ATTRS + ("errors",):
+                rows = sorted((name, v) for (a, name), v in self._counters.items() if a == attr)
+                if not rows:
+                    continue
+                metric = f"infographics_{attr}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for name, value in rows:
+                    lines.append(f'{metric}{{span="{name}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Time a block as a child of the current span. The span is added to the current
+    trace (if any) and always feeds the process metrics.
+    """
+    trace = _current_trace.get()
+    parent = _current_span.get()
+    current = Span(name, trace.trace_id if trace else None, parent.span_id if parent else None, attrs)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        current.duration = time.perf_counter() - current._started
+        if trace is not None:
+            trace.add(current)
+        METRICS.observe(current)
+
+
+@contextmanager
+def trace(trace_id: str):
+    """Collect every span opened inside the block (including in copied contexts) into one Trace."""
+    current = Trace(trace_id)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+
+
+def add_token_usage(target: Optional[Span], usage):
+    """Add an OpenAI response's token usage to a span."""
+    if target is None or usage is None:
+        return
+    target.incr("prompt_tokens", getattr(usage, "prompt_tokens", 0) or 0)
+    target.incr("completion_tokens", getattr(usage, "completion_tokens", 0) or 0)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def submit(pool, fn, *args, **kwargs):
+    """Submit to an executor so the task runs inside the caller's trace and span."""
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
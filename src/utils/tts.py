@@ -1,12 +1,33 @@
 import json
 import os
+import re
+import time
 import uuid
 import asyncio
 import subprocess
 from pathlib import Path
 from typing import List, Dict
 
-import edge_tts
+from audioMerge import StreamingAudioMerger
+from audioStore import AudioStore
+from mp3Frames import concat_mp3
+from rateLimit import AdaptiveLimiter, backoff_delay, percentile
+from tracing import span, current_span
+
+
+# Sentence end followed by the start of a new sentence; skips initialisms such as "L.E.D. ".
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])(?<!\b[A-Z]\.)\s+(?=[A-Z0-9"“])')
+
+
+class EdgeTTSBackend:
+    """Default synthesis backend: the Microsoft Edge read-aloud service via edge-tts."""
+    
+    async def save(self, text: str, voice: str, rate: str, pitch: str, output_path: str):
+        # Imported on first use so importing this module does not load edge-tts and aiohttp.
+        import edge_tts
+
+        communicate = edge_tts.Communicate(text=text, voice=voice, rate=rate, pitch=pitch)
+        await communicate.save(output_path)
 
 
 class EdgeTTSNarrationGenerator:
@@ -22,14 +43,50 @@ class EdgeTTSNarrationGenerator:
     
     def __init__(self, 
                  output_base_dir: str = "src/static/outputs/audio",
-                 voice: str = 'male_narrator'):
+                 voice: str = 'male_narrator',
+                 rate: str = '+0%',
+                 pitch: str = '+0Hz',
+                 max_concurrency: int = 8,
+                 max_retries: int = 3,
+                 split_threshold: int = 400,
+                 piece_chars: int = 250,
+                 backend=None,
+                 work_dir: str = None):
         """
         Initialize the Edge TTS audio generator
+        
+        Args:
+            max_concurrency: Upper bound on simultaneous edge-tts requests; lowered
+                             automatically while requests keep failing.
+            max_retries: Extra attempts per chunk before it is reported as failed.
+            split_threshold: Narrations longer than this many characters are split at
+                             sentence boundaries and synthesized piece by piece.
+            piece_chars: Target length of each piece; sentences are never cut.
+            backend: Object with an async save(text, voice, rate, pitch, output_path);
+                     defaults to EdgeTTSBackend. The benchmarks swap in a local stand-in.
+            work_dir: Where merged audio is written; defaults to output_base_dir. Clips
+                      always go to the shared store, merges to the job's workspace.
         """
         self.output_dir = Path(output_base_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.store = AudioStore(str(self.output_dir))
+        self.work_dir = Path(work_dir) if work_dir else self.output_dir
+        self.work_dir.mkdir(parents=True, exist_ok=True)
         
         self.voice = self.VOICES.get(voice, self.VOICES['male_narrator'])
+        self.rate = rate
+        self.pitch = pitch
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.split_threshold = split_threshold
+        self.piece_chars = piece_chars
+        self.backend = backend or EdgeTTSBackend()
+        self.limiter = None
+        self.last_run_stats = {}
+        self.last_chunk_indices = []
+        self.last_merged_file = None
+        self._latencies = []
+        self._retries = 0
         print(f"Using voice: {self.voice}")
     
     def load_narration_json(self, json_path: str) -> List[Dict]:
@@ -37,7 +94,8 @@ class EdgeTTSNarrationGenerator:
         try:
             with open(json_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-            return data.get('result', [])
+            # input_to_narration writes "results"; older files used "result"
+            return data.get('results', data.get('result', []))
         except FileNotFoundError:
             print(f"Error: Could not find '{json_path}'")
             print("Please ensure the narrationOutput.json file exists.")
@@ -62,6 +120,29 @@ class EdgeTTSNarrationGenerator:
         
         return text.strip()
     
+    def split_into_pieces(self, text: str) -> List[str]:
+        """Group sentences into pieces of roughly piece_chars characters."""
+        pieces = []
+        current = ""
+        for sentence in SENTENCE_BOUNDARY.split(text):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            if current and len(current) + len(sentence) + 1 > self.piece_chars:
+                pieces.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}" if current else sentence
+        if current:
+            pieces.append(current)
+        return pieces
+    
+    def _stitch_pieces(self, piece_paths: List[Path], key: str) -> Path:
+        """Concatenate the MP3 frames of each piece into the chunk's clip without re-encoding."""
+        temp_path = self.store.temp_path_for(key)
+        concat_mp3([str(p) for p in piece_paths], str(temp_path))
+        return self.store.commit(temp_path, key)
+    
     async def generate_audio_async(self,
                                    text: str,
                                    chunk_index: int,
@@ -69,42 +150,96 @@ class EdgeTTSNarrationGenerator:
                                    title: str = "") -> str:
         """
         Generate a single audio file asynchronously.
+        Clips already in the audio store are reused without calling edge-tts.
+        Long narrations are synthesized sentence group by sentence group in parallel
+        and stitched together, so latency follows the longest piece, not the paragraph.
         
         Returns:
             Path to generated audio file
         """
         cleaned_text = self.clean_text_for_tts(text)
+        key = self.store.key_for(cleaned_text, self.voice, self.rate, self.pitch)
         
-        unique_id = str(uuid.uuid4())[:8]
-        filename = f"audio_{chunk_index}_{unique_id}.mp3"
-        output_path = self.output_dir / filename
+        with span("tts.synthesize", chunk=chunk_index, chars=len(cleaned_text)) as s:
+            cached = self.store.lookup(key)
+            if cached:
+                print(f"\nAudio {chunk_index} found in store: {cached.name}")
+                s.set(cache_hits=1, bytes=cached.stat().st_size)
+                return str(cached)
         
-        print(f"\nGenerating audio {chunk_index}...")
-        print(f"   Section: {section}")
-        print(f"   Title: {title[:60]}..." if len(title) > 60 else f"   Title: {title}")
+            print(f"\nGenerating audio {chunk_index}...")
+            print(f"   Section: {section}")
+            print(f"   Title: {title[:60]}..." if len(title) > 60 else f"   Title: {title}")
         
-        try:
-            communicate = edge_tts.Communicate(
-                text=cleaned_text, voice=self.voice, rate='+0%', pitch='+0Hz'
-            )
-            await communicate.save(str(output_path))
-            
-            if output_path.exists() and output_path.stat().st_size > 0:
-                print(f"   Saved: {output_path.name} ({output_path.stat().st_size / 1024:.1f} KB)")
-                return str(output_path)
-            else:
-                raise Exception("Generated file is empty or missing")
+            started = time.perf_counter()
+            try:
+                pieces = self.split_into_pieces(cleaned_text) if len(cleaned_text) > self.split_threshold else []
+                if len(pieces) > 1:
+                    print(f"   Splitting into {len(pieces)} pieces")
+                    piece_paths = await asyncio.gather(*[
+                        self._synthesize_piece(piece) for piece in pieces
+                    ])
+                    output_path = self._stitch_pieces(piece_paths, key)
+                else:
+                    output_path = await self._synthesize_with_retry(cleaned_text, key)
+            except Exception as e:
+                print(f"   Error generating chunk {chunk_index}: {e}")
+                raise
+            self._latencies.append(time.perf_counter() - started)
+            s.set(pieces=max(1, len(pieces)), bytes=output_path.stat().st_size)
+        
+            print(f"   Saved: {output_path.name} ({output_path.stat().st_size / 1024:.1f} KB)")
+            return str(output_path)
+    
+    async def _synthesize_piece(self, piece: str) -> Path:
+        """Synthesize one sentence group; pieces are stored too, so repeated sentences are reused."""
+        key = self.store.key_for(piece, self.voice, self.rate, self.pitch)
+        cached = self.store.lookup(key)
+        if cached:
+            return cached
+        return await self._synthesize_with_retry(piece, key)
+    
+    async def _synthesize_with_retry(self, cleaned_text: str, key: str) -> Path:
+        """Synthesize one clip into the store, retrying transient failures with jittered backoff."""
+        if self.limiter is None:
+            self.limiter = AdaptiveLimiter(self.max_concurrency)
+        
+        for attempt in range(self.max_retries + 1):
+            temp_path = self.store.temp_path_for(key)
+            try:
+                async with self.limiter:
+                    await self.backend.save(cleaned_text, self.voice, self.rate, self.pitch, str(temp_path))
                 
-        except Exception as e:
-            print(f"   Error generating chunk {chunk_index}: {e}")
-            raise
+                if not temp_path.exists() or temp_path.stat().st_size == 0:
+                    raise Exception("Generated file is empty or missing")
+                
+                self.limiter.record(True)
+                return self.store.commit(temp_path, key)
+            
+            except Exception as e:
+                self.limiter.record(False)
+                if temp_path.exists():
+                    temp_path.unlink()
+                if attempt == self.max_retries:
+                    raise
+                self._retries += 1
+                if current_span() is not None:
+                    current_span().incr("retries")
+                delay = backoff_delay(attempt)
+                print(f"   Attempt {attempt + 1} failed ({e}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
     
-    async def process_narration_file_async(self, json_path: str) -> List[str]:
+    async def process_narration_file_async(self, json_path: str, merged_output: str = None) -> List[str]:
         """
         Process entire narration JSON file asynchronously and in parallel.
         
+        Args:
+            merged_output: If given, clips are appended to this MP3 in chunk order as
+                           they finish, so the merged file is ready with the last chunk.
+                           Its final path (or None) is left in self.last_merged_file.
+        
         Returns:
-            List of paths to successfully generated audio files
+            List of paths to successfully generated audio files, in chunk order
         """
         print("="*70)
         print("CRYSTAL-CLEAR NARRATION AUDIO GENERATOR (Edge TTS)")
@@ -113,42 +248,68 @@ class EdgeTTSNarrationGenerator:
         narrations = self.load_narration_json(json_path)
         if not narrations:
             print("No narration data found. Exiting.")
+            self.last_merged_file = None
             return []
             
         print(f"\nLoaded {len(narrations)} narration chunks from {json_path}")
+        return await self.process_narrations_async(narrations, merged_output)
+    
+    async def process_narrations_async(self, narrations: List[Dict], merged_output: str = None) -> List[str]:
+        """Generate audio for narration entries already in memory; see process_narration_file_async."""
         print(f"Output directory: {self.output_dir}")
         
         # Create a list of tasks to run concurrently
         print(f"\nCreating {len(narrations)} audio generation tasks...")
+        self.limiter = AdaptiveLimiter(self.max_concurrency)
+        self._latencies = []
+        self._retries = 0
+        merger = StreamingAudioMerger(merged_output, len(narrations)) if merged_output else None
         tasks = []
+        task_indices = []
         for idx, chunk in enumerate(narrations):
             narration_script = chunk.get('narration_script', '')
             if not narration_script:
                 print(f"\nWarning: Empty narration script for chunk {idx}. Skipping.")
+                if merger:
+                    merger.skip(idx)
                 continue
             
             tasks.append(
-                self.generate_audio_async(
+                self._generate_and_merge(
+                    merger,
                     text=narration_script,
                     chunk_index=idx,
                     section=chunk.get('section', 'Unknown'),
                     title=chunk.get('title', 'Untitled')
                 )
             )
+            task_indices.append(idx)
 
-        print(f"Running {len(tasks)} tasks in parallel...")
+        print(f"Running {len(tasks)} tasks (up to {self.max_concurrency} at a time)...")
         # Run tasks concurrently, collecting all results (even exceptions)
+        started = time.perf_counter()
         results = await asyncio.gather(*tasks, return_exceptions=True)
+        elapsed = time.perf_counter() - started
         
         # Process results
         audio_files = []
         failed_chunks = []
-        for idx, result in enumerate(results):
+        self.last_chunk_indices = []
+        for idx, result in zip(task_indices, results):
             if isinstance(result, Exception):
                 print(f"   Task for chunk {idx} failed: {result}")
                 failed_chunks.append(idx)
             else:
                 audio_files.append(result)
+                self.last_chunk_indices.append(idx)
+        
+        if merger:
+            with span("audio.merge", method="streaming", inputs=merger.written) as s:
+                self.last_merged_file = merger.close()
+                if self.last_merged_file:
+                    s.set(bytes=Path(self.last_merged_file).stat().st_size)
+        else:
+            self.last_merged_file = None
         
         print("\n" + "="*70)
         print(f"COMPLETE: Generated {len(audio_files)}/{len(tasks)} audio files")
@@ -156,17 +317,60 @@ class EdgeTTSNarrationGenerator:
         if failed_chunks:
             print(f"Failed chunks: {failed_chunks}")
         
+        self.last_run_stats = self._run_stats(len(tasks), audio_files, failed_chunks, elapsed)
+        self.print_run_stats(self.last_run_stats)
+        
         print(f"All files saved to: {self.output_dir.absolute()}")
         print("="*70)
         
         return audio_files
 
-    def merge_audio_files(self, audio_files: List[str]) -> str:
+    async def _generate_and_merge(self, merger, chunk_index: int, **kwargs) -> str:
+        """Generate one chunk and hand it to the streaming merger as soon as it is done."""
+        try:
+            path = await self.generate_audio_async(chunk_index=chunk_index, **kwargs)
+        except Exception:
+            if merger:
+                merger.skip(chunk_index)
+            raise
+        if merger:
+            merger.add(chunk_index, path)
+        return path
+
+    def _run_stats(self, total: int, audio_files: List[str], failed_chunks: List[int], elapsed: float) -> Dict:
+        total_bytes = sum(Path(p).stat().st_size for p in audio_files if Path(p).exists())
+        return {
+            'chunks': total,
+            'succeeded': len(audio_files),
+            'failed': len(failed_chunks),
+            'synthesized': len(self._latencies),
+            'retries': self._retries,
+            'wall_time_s': elapsed,
+            'chunks_per_s': len(audio_files) / elapsed if elapsed else 0.0,
+            'bytes_per_s': total_bytes / elapsed if elapsed else 0.0,
+            'latency_p50_s': percentile(self._latencies, 50),
+            'latency_p95_s': percentile(self._latencies, 95),
+            'final_concurrency': self.limiter.limit if self.limiter else self.max_concurrency,
+        }
+
+    def print_run_stats(self, stats: Dict):
+        print(f"Throughput: {stats['chunks_per_s']:.2f} chunks/s, "
+              f"{stats['bytes_per_s'] / 1024:.1f} KB/s over {stats['wall_time_s']:.1f}s")
+        print(f"Chunk latency: p50 {stats['latency_p50_s']:.2f}s, p95 {stats['latency_p95_s']:.2f}s "
+              f"({stats['synthesized']} synthesized, {stats['retries']} retries, "
+              f"final concurrency {stats['final_concurrency']})")
+
+    def merge_audio_files(self, audio_files: List[str], indices: List[int] = None) -> str:
         """
-        Merges a list of audio files into a single MP3 using FFmpeg.
+        Merges a list of audio files into a single MP3.
+        
+        Frames are joined in-process (see mp3Frames.concat_mp3); FFmpeg is only
+        spawned if the native merge cannot handle the inputs.
         
         Args:
             audio_files: A list of string paths to the audio files to merge.
+            indices: Chunk index of each file. Files are merged in index order;
+                     without indices they are merged in the order given.
                          
         Returns:
             The path to the final merged audio file, or None if merging failed.
@@ -176,20 +380,30 @@ class EdgeTTSNarrationGenerator:
             return None
             
         print("\n" + "="*70)
-        print(f"Merging {len(audio_files)} audio files using FFmpeg...")
+        print(f"Merging {len(audio_files)} audio files...")
 
-        # Create a temporary file list for FFmpeg
+        if indices is not None:
+            sorted_files = [path for _, path in sorted(zip(indices, audio_files), key=lambda pair: pair[0])]
+        else:
+            sorted_files = list(audio_files)
+        
+        merge_uuid = str(uuid.uuid4())[:8]
+        merged_filename = f"audio_merge_{merge_uuid}.mp3"
+        merged_output_path = self.work_dir / merged_filename
         
-        # Sort files by chunk index ("audio_<index>_...") to ensure correct order.
         try:
-            sorted_files = sorted(audio_files, key=lambda p: int(Path(p).name.split('_')[1]))
-            print("   Files sorted by chunk index.")
-        except Exception as e:
-            print(f"   Warning: Could not sort files by chunk index ({e}). Merging in original order.")
-            sorted_files = audio_files
+            with span("audio.merge", method="native", inputs=len(sorted_files)) as s:
+                concat_mp3(sorted_files, str(merged_output_path))
+                s.set(bytes=merged_output_path.stat().st_size)
+            print(f"   Merge complete. File saved as:")
+            print(f"   {merged_output_path.absolute()}")
+            print("="*70)
+            return str(merged_output_path)
+        except (OSError, ValueError) as e:
+            print(f"   Native merge failed ({e}); falling back to FFmpeg.")
         
-        # Create a temporary file list in the output directory
-        list_filename = self.output_dir / "mergelist.txt"
+        # Create a temporary file list next to the merged file, unique to this merge
+        list_filename = self.work_dir / f"mergelist_{merge_uuid}.txt"
         
         try:
             with open(list_filename, 'w', encoding='utf-8') as f:
@@ -198,10 +412,6 @@ class EdgeTTSNarrationGenerator:
                     f.write(f"file '{Path(file_path).resolve()}'\n")
             
             # Prepare the FFmpeg command
-            merge_uuid = str(uuid.uuid4())[:8]
-            merged_filename = f"audio_merge_{merge_uuid}.mp3"
-            merged_output_path = self.output_dir / merged_filename
-            
             ffmpeg_command = [
                 "ffmpeg",
                 "-f", "concat",
@@ -214,10 +424,12 @@ class EdgeTTSNarrationGenerator:
             print(f"   Exporting merged file: {merged_filename}...")
             
             # Run the FFmpeg command
-            result = subprocess.run(ffmpeg_command, 
-                                    capture_output=True, 
-                                    text=True, 
-                                    check=True)
+            with span("audio.merge", method="ffmpeg", inputs=len(sorted_files)) as s:
+                result = subprocess.run(ffmpeg_command, 
+                                        capture_output=True, 
+                                        text=True, 
+                                        check=True)
+                s.set(bytes=merged_output_path.stat().st_size)
 
             print(f"   Merge complete. File saved as:")
             print(f"   {merged_output_path.absolute()}")
@@ -241,20 +453,52 @@ class EdgeTTSNarrationGenerator:
             if os.path.exists(list_filename):
                 os.remove(list_filename)
 
-    def process_narration_file(self, json_path: str):
+    def collect_garbage(self, min_age: float = 3600) -> List[str]:
+        """Remove audio files that no job references any more."""
+        removed = self.store.collect_garbage(min_age=min_age)
+        if removed:
+            print(f"Removed {len(removed)} unreferenced audio files from {self.output_dir}")
+        return removed
+
+    def process_narrations(self, narrations: List[Dict], job_id: str = "default"):
         """
-        Synchronous wrapper for async processing and merging.
+        Synchronous generation and streaming merge for in-memory narration entries.
         
         Returns:
             Tuple of: (List of individual file paths, Path to merged file)
         """
-        individual_files = asyncio.run(self.process_narration_file_async(json_path))
+        merged_output = self.work_dir / f"audio_merge_{str(uuid.uuid4())[:8]}.mp3"
+        individual_files = asyncio.run(
+            self.process_narrations_async(narrations, merged_output=str(merged_output))
+        )
+        return self._finish_run(individual_files, job_id)
+
+    def process_narration_file(self, json_path: str, job_id: str = "default"):
+        """
+        Synchronous wrapper for async processing and merging.
+        The files produced are recorded as the references of `job_id`, replacing
+        whatever that job referenced before.
         
+        Returns:
+            Tuple of: (List of individual file paths, Path to merged file)
+        """
+        merged_output = self.work_dir / f"audio_merge_{str(uuid.uuid4())[:8]}.mp3"
+        individual_files = asyncio.run(
+            self.process_narration_file_async(json_path, merged_output=str(merged_output))
+        )
+        return self._finish_run(individual_files, job_id)
+
+    def _finish_run(self, individual_files: List[str], job_id: str):
         if not individual_files:
             print("No individual files were generated. Skipping merge.")
             return individual_files, None
             
-        merged_file_path = self.merge_audio_files(individual_files)
+        merged_file_path = self.last_merged_file
+        if merged_file_path:
+            print(f"Merged audio streamed to: {Path(merged_file_path).absolute()}")
+        else:
+            merged_file_path = self.merge_audio_files(individual_files, self.last_chunk_indices)
+        self.store.record_job(job_id, individual_files + [merged_file_path])
         return individual_files, merged_file_path
 
 
@@ -309,6 +553,8 @@ def main():
             print(f"Success! All files ready for use.\n")
         else:
             print("Process finished, but no merged file was created.")
+        
+        generator.collect_garbage()
             
     except Exception as e:
         print(f"\nAn unexpected error occurred: {e}\n")
@@ -1,11 +1,10 @@
-from inputToNarration import input_to_narration
-from manimGenerator import generate_manim_script, render_manim_video
+import sys
+from pipeline import run_pipeline
 
-# testing inputToNarration.py
-input_to_narration('src/utils/standards.json')
-
-
-# testing manimGenerator.py
-# narration_json_path = 'src/utils/narrationOutput.json'
-# generate_manim_script(narration_json_path)
-# render_manim_video('src/static/outputs/temp/manimScript.py')
\ No newline at end of file
+# Runs ingest -> narration -> (images | tts -> manim_script -> render) as a dependency graph
+# and prints per-stage timings and the critical path. The render stage writes a 480p preview
+# first; the 1080p60 render finishes in the background before the process exits.
+# The guard matters: renderer pool workers are spawned and re-import this file.
+if __name__ == "__main__":
+    input_path = sys.argv[1] if len(sys.argv) > 1 else 'src/utils/standards.json'
+    run_pipeline(input_path)
@@ -0,0 +1,138 @@
+import os
+import time
+import shutil
+from pathlib import Path
+from typing import Iterable, List
+
+
+WORKSPACES_DIR = "src/static/outputs/jobs"
+# Per-job limit on the files a pipeline run may leave in its workspace
+WORKSPACE_QUOTA_BYTES = int(os.getenv("WORKSPACE_QUOTA_BYTES", 2 * 1024 ** 3))
+# Finished workspaces are deleted this many seconds after they were last written
+JOB_TTL = float(os.getenv("JOB_TTL", 7 * 24 * 3600))
+# Upper bound on all workspaces together; the oldest are deleted first
+WORKSPACES_MAX_BYTES = int(os.getenv("WORKSPACES_MAX_BYTES", 20 * 1024 ** 3))
+# Same limits for shared stores that only grow, such as the downloaded images
+STORE_TTL = float(os.getenv("STORE_TTL", 30 * 24 * 3600))
+STORE_MAX_BYTES = int(os.getenv("STORE_MAX_BYTES", 5 * 1024 ** 3))
+
+
+class QuotaExceeded(RuntimeError):
+    pass
+
+
+def disk_usage(path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+class Workspace:
+    """
+    Directory owning every file one pipeline run writes: scene scripts, merged audio,
+    render media and the final video. Jobs never share a path, so any number of them
+    can run side by side. The content-addressed stores (audio store, render cache,
+    image search cache, downloaded images) stay shared.
+    """
+
+    def __init__(self, job_id: str, root: str = WORKSPACES_DIR, quota_bytes: int = WORKSPACE_QUOTA_BYTES):
+        self.job_id = job_id
+        self.path = Path(root) / job_id
+        self.quota_bytes = quota_bytes
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def dir(self, name: str) -> Path:
+        path = self.path / name
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def usage(self) -> int:
+        return disk_usage(self.path)
+
+    def check_quota(self):
+        used = self.usage()
+        if used > self.quota_bytes:
+            raise QuotaExceeded(
+                f"Job {self.job_id} uses {used / 1024 ** 2:.0f} MB, over its {self.quota_bytes / 1024 ** 2:.0f} MB quota"
+            )
+
+
+def _last_written(path: Path) -> float:
+    # job.json and trace.json are rewritten on every update, so the top level is enough.
+    stamps = [path.stat().st_mtime]
+    for child in path.iterdir():
+        try:
+            stamps.append(child.stat().st_mtime)
+        except FileNotFoundError:
+            continue
+    return max(stamps)
+
+
+def cleanup_workspaces(root: str = WORKSPACES_DIR, ttl: float = JOB_TTL, max_bytes: int = WORKSPACES_MAX_BYTES,
+                       keep: Iterable[str] = ()) -> List[str]:
+    """
+    Delete workspaces not written for `ttl` seconds, then the oldest remaining ones until
+    all of them together fit in `max_bytes`. Workspaces named in `keep` (jobs still
+    running) are never touched. Returns the job ids removed.
+    """
+    keep = set(keep)
+    now = time.time()
+    workspaces = []
+    for path in Path(root).iterdir() if Path(root).exists() else []:
+        if not path.is_dir() or path.name in keep:
+            continue
+        try:
+            workspaces.append((_last_written(path), disk_usage(path), path))
+        except FileNotFoundError:
+            continue
+
+    total = sum(size for _, size, _ in workspaces) + sum(disk_usage(Path(root) / k) for k in keep)
+    removed = []
+    for stamp, size, path in sorted(workspaces, key=lambda w: w[0]):
+        if now - stamp <= ttl and total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed.append(path.name)
+
+    if removed:
+        print(f"Removed {len(removed)} job workspaces from {root}")
+    return removed
+
+
+def cleanup_files(root: str, ttl: float = STORE_TTL, max_bytes: int = STORE_MAX_BYTES) -> List[str]:
+    """
+    Like cleanup_workspaces, for a flat store of files: delete those not written for
+    `ttl` seconds, then the oldest until the rest fit in `max_bytes`. Stores refresh
+    the mtime of a file they reuse, so it counts as written. Returns the names removed.
+    """
+    now = time.time()
+    files = []
+    for path in Path(root).iterdir() if Path(root).exists() else []:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        if path.is_file():
+            files.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    removed = []
+    for stamp, size, path in sorted(files, key=lambda f: f[0]):
+        if now - stamp <= ttl and total <= max_bytes:
+            break
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed.append(path.name)
+
+    if removed:
+        print(f"Removed {len(removed)} files from {root}")
+    return removed
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The pipeline modules import each other by bare name, as when run from src/utils.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "src", "utils")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
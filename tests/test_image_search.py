@@ -0,0 +1,57 @@
+import time
+import asyncio
+import threading
+
+import generateImages
+
+
+def test_concurrent_searches_share_one_lookup_per_query(monkeypatch):
+    calls = []
+    running = 0
+    peak = 0
+
+    async def fake_search(session, query):
+        nonlocal running, peak
+        calls.append(query)
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "" if query == "miss" else f"https://img/{query}"
+
+    monkeypatch.setattr(generateImages, "google_image_search", fake_search)
+    cache = {"cached": {"url": "https://img/cached", "fetched_at": 1e12}}
+
+    async def run():
+        searcher = generateImages.ImageSearcher(None, cache, concurrency=2)
+        batches = [["a", "b", "cached"], ["b", "c", "miss"], ["a", "c", "miss", "d"]]
+        return await asyncio.gather(*[searcher.search(q) for q in batches])
+
+    first, second, third = asyncio.run(run())
+    assert sorted(calls) == ["a", "b", "c", "d", "miss"]
+    assert peak <= 2
+    assert first == {"a": "https://img/a", "b": "https://img/b", "cached": "https://img/cached"}
+    assert second["miss"] == "" and third["d"] == "https://img/d"
+    assert "miss" not in cache and cache["c"]["url"] == "https://img/c"
+
+
+def test_concurrent_saves_merge_instead_of_overwriting(tmp_path, monkeypatch):
+    monkeypatch.setattr(generateImages, "CACHE_FILE", str(tmp_path / "cache" / "image_search.json"))
+    now = time.time()
+    generateImages.save_search_cache({"shared": {"url": "https://img/old", "fetched_at": now - 10}})
+
+    def save(job):
+        generateImages.save_search_cache({
+            f"{job}-{i}": {"url": f"https://img/{job}/{i}", "fetched_at": now} for i in range(20)
+        } | {"shared": {"url": f"https://img/{job}", "fetched_at": now + job}})
+
+    threads = [threading.Thread(target=save, args=(job,)) for job in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    cache = generateImages.load_search_cache()
+    assert len(cache) == 6 * 20 + 1
+    assert cache["shared"]["url"] == "https://img/5"
+    assert not list((tmp_path / "cache").glob("*.tmp"))
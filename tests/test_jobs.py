@@ -0,0 +1,59 @@
+import json
+import threading
+
+from src.jobs import Job, JobManager
+
+
+def make_job(manager, stages=("images", "tts")):
+    job_id = manager.create_job_dir()
+    job = Job(job_id, "input.json", list(stages))
+    manager._jobs[job_id] = job
+    return job
+
+
+def test_concurrent_reports_do_not_fail(tmp_path):
+    manager = JobManager(jobs_dir=str(tmp_path), max_workers=1)
+    job = make_job(manager)
+    errors = []
+
+    def report(stage):
+        try:
+            for _ in range(200):
+                manager._report(job, stage, "running")
+                manager._report(job, stage, "done")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=report, args=(stage,)) for stage in ("images", "tts", "images", "tts")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    with open(tmp_path / job.id / "job.json") as f:
+        state = json.load(f)
+    assert {name: s["status"] for name, s in state["stages"].items()} == {"images": "done", "tts": "done"}
+    assert not list((tmp_path / job.id).glob("*.tmp"))
+
+
+def test_failed_save_does_not_raise(tmp_path):
+    manager = JobManager(jobs_dir=str(tmp_path), max_workers=1)
+    job = make_job(manager)
+    (tmp_path / job.id).rmdir()
+    manager._report(job, "images", "running")
+
+
+def test_snapshot_is_detached_and_falls_back_to_job_json(tmp_path):
+    manager = JobManager(jobs_dir=str(tmp_path), max_workers=1)
+    job = make_job(manager)
+    manager._save(job)
+
+    state = manager.snapshot(job.id)
+    state["stages"]["images"]["status"] = "changed"
+    assert job.stages["images"]["status"] == "pending"
+
+    restarted = JobManager(jobs_dir=str(tmp_path), max_workers=1)
+    assert restarted.snapshot(job.id)["id"] == job.id
+    assert restarted.snapshot("..") is None
+    assert restarted.snapshot("missing") is None
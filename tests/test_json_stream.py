@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from jsonStream import JsonArrayStream
+
+
+ELEMENTS = [
+    {"section": "Section 680", "narration_script": 'Braces { and } and "quotes" stay in strings', "images": ["pump"]},
+    {"section": "Section 690", "narration_script": "Escaped \\\\ backslash, [brackets] and ]", "images": []},
+    {"section": "Section 700", "nested": {"results": [1, 2]}, "images": [["a"], ["b"]]},
+]
+
+
+def feed_all(stream, text, step):
+    closed = []
+    for i in range(0, len(text), step):
+        closed += stream.feed(text[i:i + step])
+    return closed
+
+
+@pytest.mark.parametrize("step", [1, 2, 7, 1000])
+def test_keyed_array_elements_close_as_they_stream(step):
+    text = json.dumps({"meta": [{"skip": True}], "note": "results", "results": ELEMENTS}, indent=2)
+    stream = JsonArrayStream()
+    closed = feed_all(stream, text, step)
+    assert closed == list(enumerate(ELEMENTS))
+    assert stream.done and stream.text == text
+    assert json.loads(stream.text)["results"] == ELEMENTS
+
+
+def test_bare_array():
+    stream = JsonArrayStream()
+    assert feed_all(stream, json.dumps(ELEMENTS), 3) == list(enumerate(ELEMENTS))
+    assert stream.done
+
+
+def test_element_is_returned_when_it_closes_not_before():
+    stream = JsonArrayStream()
+    assert stream.feed('{"results": [{"a": 1') == []
+    assert stream.feed('}, {"b"') == [(0, {"a": 1})]
+    assert stream.feed(': 2}]') == [(1, {"b": 2})]
+    assert stream.done
+    assert stream.feed('}') == []
+
+
+def test_other_key_and_later_arrays_are_ignored():
+    stream = JsonArrayStream(key="items")
+    text = json.dumps({"results": [{"x": 1}], "items": [{"y": 2}], "extra": [{"z": 3}]})
+    assert stream.feed(text) == [(0, {"y": 2})]
@@ -0,0 +1,94 @@
+import struct
+
+import pytest
+
+from mp3Frames import (
+    build_info_frame, concat_mp3, duration_seconds, parse_header, read_audio_frames,
+)
+
+
+# MPEG-1 Layer III, no CRC, 44.1 kHz, joint stereo; the bitrate index goes in bits 12-15.
+BASE_HEADER = 0xFFFB0040
+SAMPLE_RATE = 44100
+FRAME_SECONDS = 1152 / SAMPLE_RATE
+
+
+def frame(bitrate_index=9, raw=BASE_HEADER, fill=0x55):
+    header = parse_header(raw | (bitrate_index << 12))
+    return struct.pack(">I", header.raw) + bytes([fill]) * (header.length - 4)
+
+
+def mp3_file(path, frames, id3=True, info=True, junk=b"", id3v1=False):
+    data = b""
+    if id3:
+        data += b"ID3\x03\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10
+    first = parse_header(struct.unpack(">I", frames[0][:4])[0])
+    if info:
+        data += build_info_frame(first, len(frames), 0, vbr=False)
+    data += junk + b"".join(frames)
+    if id3v1:
+        data += b"TAG" + b"\x00" * 125
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_parse_header():
+    header = parse_header(BASE_HEADER | (9 << 12))
+    assert (header.version, header.layer, header.sample_rate, header.length) == (1, 3, 44100, 417)
+    assert header.samples == 1152
+    assert parse_header(0x12345678) is None
+    assert parse_header(BASE_HEADER | (15 << 12)) is None
+
+
+def test_concat_skips_tags_and_info_frames_and_writes_one_info_frame(tmp_path):
+    a = mp3_file(tmp_path / "a.mp3", [frame() for _ in range(3)], id3v1=True)
+    b = mp3_file(tmp_path / "b.mp3", [frame(fill=0x66) for _ in range(5)], junk=b"\x00\xff\x00junk")
+    out = tmp_path / "out.mp3"
+    concat_mp3([a, b], str(out))
+
+    data = out.read_bytes()
+    info = parse_header(struct.unpack(">I", data[:4])[0])
+    tag_at = 4 + 32
+    assert data[tag_at:tag_at + 4] == b"Info"
+    flags, frames, size = struct.unpack(">III", data[tag_at + 4:tag_at + 16])
+    assert (frames, size) == (8, len(data))
+    assert len(data) == info.length + 8 * 417
+
+    first, runs = read_audio_frames(data)
+    assert first.bitrate_index == 9 and runs == [(info.length, len(data))]
+    assert duration_seconds(str(out)) == pytest.approx(8 * FRAME_SECONDS)
+    assert duration_seconds(a) == pytest.approx(3 * FRAME_SECONDS)
+
+
+def test_mixed_bitrates_get_a_xing_frame(tmp_path):
+    a = mp3_file(tmp_path / "a.mp3", [frame(9), frame(11)])
+    out = tmp_path / "out.mp3"
+    concat_mp3([a], str(out))
+    assert out.read_bytes()[36:40] == b"Xing"
+
+
+def test_mismatched_or_empty_inputs_raise_and_leave_no_output(tmp_path):
+    a = mp3_file(tmp_path / "a.mp3", [frame()])
+    mono_48k = mp3_file(tmp_path / "b.mp3", [frame(raw=0xFFFB04C0)])
+    out = tmp_path / "out.mp3"
+    with pytest.raises(ValueError):
+        concat_mp3([a, mono_48k], str(out))
+    assert not out.exists()
+
+    (tmp_path / "empty.mp3").write_bytes(b"")
+    with pytest.raises(ValueError):
+        concat_mp3([str(tmp_path / "empty.mp3")], str(out))
+    with pytest.raises(ValueError):
+        concat_mp3([], str(out))
+    assert not out.exists()
+
+
+def test_info_frame_grows_bitrate_when_the_template_frame_is_too_small():
+    # MPEG-2 Layer III at 8 kbps / 24 kHz: a 24-byte frame cannot hold the 37-byte tag.
+    template = parse_header(0xFFF31440)
+    assert (template.version, template.length) == (2, 24)
+    info = build_info_frame(template, 10, 1000, vbr=True)
+    header = parse_header(struct.unpack(">I", info[:4])[0])
+    assert header.bitrate_index > 1 and len(info) == header.length >= 4 + 17 + 16
+    assert info[21:25] == b"Xing"
+    assert struct.unpack(">III", info[25:37]) == (3, 10, 1000)
@@ -0,0 +1,20 @@
+import json
+
+from inputToNarration import parse_batch_response
+from manimTemplate import build_script
+
+
+def test_narrations_carry_source_and_page_into_the_footer():
+    batch = [
+        {"section": "Section 680", "title": "Pools", "content": "...", "source": "spec.pdf", "page_number": 12},
+        {"section": "Section 690", "title": "Solar", "content": "..."},
+    ]
+    response = json.dumps({"results": [
+        {"narration_script": "Pumps must be bonded.", "source": "made up", "page_number": 99},
+        {"narration_script": "Panels shall be grounded."},
+    ]})
+
+    first, second = parse_batch_response(response, batch)
+    assert (first["source"], first["page_number"]) == ("spec.pdf", 12)
+    assert "source" not in second and second["section"] == "Section 690"
+    assert "footer_note='spec.pdf, p. 12'" in build_script({"results": [first, second]})
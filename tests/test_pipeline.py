@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+from pipeline import Pipeline, Stage
+
+
+def test_runs_in_dependency_order_and_passes_artifacts():
+    stages = [
+        Stage("render", lambda i: i["script"] + "+render", ["script"]),
+        Stage("script", lambda i: f"{i['tts']}+{i['images']}", ["tts", "images"]),
+        Stage("tts", lambda i: i["narration"] + "+tts", ["narration"]),
+        Stage("images", lambda i: i["narration"] + "+img", ["narration"]),
+        Stage("narration", lambda i: "n"),
+    ]
+    pipeline = Pipeline(stages)
+    assert pipeline.order.index("narration") < pipeline.order.index("tts") < pipeline.order.index("script")
+
+    events = []
+    artifacts, timings = pipeline.run(report=lambda stage, status: events.append((stage, status)))
+    assert artifacts["render"] == "n+tts+n+img+render"
+    assert set(timings) == {s.name for s in stages}
+    assert events.index(("narration", "done")) < events.index(("tts", "running"))
+    assert events.index(("script", "done")) < events.index(("render", "running"))
+
+
+def test_independent_stages_overlap():
+    barrier = threading.Barrier(2, timeout=5)
+
+    def meet(_):
+        barrier.wait()
+        return True
+
+    pipeline = Pipeline([Stage("root", lambda i: None), Stage("a", meet, ["root"]), Stage("b", meet, ["root"])])
+    artifacts, timings = pipeline.run()
+    assert artifacts["a"] and artifacts["b"]
+    assert timings["a"][0] < timings["b"][1] and timings["b"][0] < timings["a"][1]
+
+
+def test_failure_stops_scheduling_and_is_reraised():
+    started = []
+    events = []
+
+    def record(name, result=None):
+        def func(_):
+            started.append(name)
+            return result
+        return func
+
+    def fail(_):
+        started.append("tts")
+        raise RuntimeError("edge-tts down")
+
+    def slow(_):
+        started.append("images")
+        time.sleep(0.2)
+        return []
+
+    pipeline = Pipeline([
+        Stage("narration", record("narration")),
+        Stage("tts", fail, ["narration"]),
+        Stage("images", slow, ["narration"]),
+        Stage("script", record("script"), ["tts"]),
+        Stage("after_images", record("after_images"), ["images"]),
+    ])
+    with pytest.raises(RuntimeError, match="edge-tts down"):
+        pipeline.run(report=lambda stage, status: events.append((stage, status)))
+    # The stage already running is allowed to finish, but nothing new starts.
+    assert sorted(started) == ["images", "narration", "tts"]
+    assert ("tts", "failed") in events and ("images", "done") in events
+
+
+def test_rejects_unknown_dependencies_and_cycles():
+    with pytest.raises(ValueError, match="unknown"):
+        Pipeline([Stage("a", lambda i: None, ["missing"])])
+    with pytest.raises(ValueError, match="cycle"):
+        Pipeline([Stage("a", lambda i: None, ["b"]), Stage("b", lambda i: None, ["a"])])
+
+
+def test_critical_path():
+    pipeline = Pipeline([
+        Stage("n", lambda i: None), Stage("tts", lambda i: None, ["n"]),
+        Stage("img", lambda i: None, ["n"]), Stage("render", lambda i: None, ["tts"]),
+    ])
+    timings = {"n": (0, 2), "tts": (2, 5), "img": (2, 9), "render": (5, 6)}
+    assert pipeline.critical_path(timings) == (9, ["n", "img"])
+    assert pipeline.critical_path({}) == (0.0, [])
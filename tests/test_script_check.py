@@ -0,0 +1,105 @@
+from manimTemplate import build_script
+from scriptCheck import check_source, validate_scene
+
+
+SCENE = '''from manim import *
+
+
+class Demo(Scene):
+    def construct(self):
+{body}
+'''
+
+
+def check(body, imports=""):
+    source = imports + SCENE.format(body="\n".join("        " + line for line in body.splitlines()))
+    return check_source(source, ["Demo"])
+
+
+def test_template_output_passes():
+    narration = {"results": [
+        {"section": "Section 680", "title": "Pools", "narration_script": "Pumps must be bonded. Lights are GFCI.",
+         "source": "spec.pdf", "page_number": 3, "audio_duration": 4.2},
+        {"section": "Section 690", "narration_script": "Panels shall be grounded."},
+    ]}
+    for per_section in (False, True):
+        source = build_script(narration, per_section=per_section)
+        scenes = ["Section000", "Section001"] if per_section else ["Explainer"]
+        assert check_source(source, scenes) == []
+
+
+def test_allowed_apis_pass():
+    body = (
+        "dots = VGroup(*[Dot(np.array([np.cos(a), np.sin(a), 0])) for a in np.linspace(0, TAU, 6)])\n"
+        "self.play(Create(dots), rate_func=smooth, run_time=math.sqrt(2))\n"
+        "self.wait(random.uniform(0.5, 1.0))"
+    )
+    assert check(body, "import math\nimport random\n") == []
+
+
+def test_missing_scene_and_syntax_error():
+    assert check_source("from manim import *\n", ["Demo"]) == ["scene Demo is not defined"]
+    assert check_source("class Demo(:\n", ["Demo"])[0].startswith("syntax error")
+
+
+def test_rejects_imports():
+    assert check("x = 1", "import os\n")
+    assert check("x = 1", "import numpy.ctypeslib\n")
+    assert check("x = 1", "from manim.utils.commands import capture\n")
+    assert check("x = 1", "from manim import capture\n")
+
+
+def test_rejects_builtins_and_dunders():
+    assert check("open('x', 'w')")
+    assert check("f = getattr(Text, 'x')")
+    assert check("Text.__subclasses__()")
+    assert check("self.renderer.file_writer.movie_file_path = None\nself.add_sound('x.wav')")
+
+
+def test_rejects_module_attributes_outside_allowlist():
+    assert check("np.savetxt('out.txt', [1])", "import numpy as np\n")
+    assert check("m = np", "import numpy as np\n")
+
+
+def test_star_imported_numpy_is_checked_like_an_import():
+    # np comes in through `from manim import *` only.
+    assert check("x = np.linspace(0, 1, 5)") == []
+    problems = check("np.savetxt('out.txt', [1])")
+    assert problems and "np.savetxt" in problems[0]
+    assert check("np.lib.npyio.savetxt('out.txt', [1])")
+    assert check("f = np\nf.savetxt('out.txt', [1])")
+
+
+def test_star_imported_helpers_cannot_be_laundered_through_assignment():
+    problems = check("run = capture\nrun(['ls'])")
+    assert problems and "capture" in problems[0]
+    assert check("capture(['ls'])")
+    assert check("handler = Path('x')")
+    assert check("items = [capture]")
+
+
+def test_unknown_name_reads_are_rejected_but_own_names_pass():
+    body = (
+        "def helper(mob):\n"
+        "    return mob.scale(0.5)\n"
+        "title = helper(Text('hi', color=BLUE))\n"
+        "self.play(Write(title))"
+    )
+    assert check(body) == []
+    assert check("self.play(Write(undefined_thing))")
+
+
+def test_validate_scene_skips_dry_run_when_check_fails(tmp_path):
+    script = tmp_path / "scene.py"
+    script.write_text(SCENE.format(body="        open('x')"))
+    calls = []
+
+    def dry_run(path, name):
+        calls.append(name)
+        return {"problems": [], "duration_s": 1.0}
+
+    result = validate_scene(str(script), "Demo", dry_run)
+    assert not result["ok"] and result["problems"] and calls == []
+
+    script.write_text(SCENE.format(body="        self.wait(1)"))
+    assert validate_scene(str(script), "Demo", dry_run) == {"ok": True, "problems": [], "duration_s": 1.0}
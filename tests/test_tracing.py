@@ -0,0 +1,41 @@
+import json
+import threading
+
+from tracing import Span, Trace
+
+
+def test_span_to_dict_is_a_copy():
+    s = Span("stage", "t1", None, {"bytes": 1})
+    d = s.to_dict()
+    s.incr("bytes", 5)
+    assert d["attrs"] == {"bytes": 1}
+
+
+def test_export_while_spans_update(tmp_path):
+    trace = Trace("t1")
+    spans = [Span(f"s{i}", "t1", None, {}) for i in range(8)]
+    for s in spans:
+        trace.add(s)
+    path = tmp_path / "trace.json"
+    stop = threading.Event()
+
+    def update():
+        n = 0
+        while not stop.is_set():
+            spans[n % len(spans)].set(**{f"k{n % 50}": n})
+            n += 1
+
+    updater = threading.Thread(target=update)
+    updater.start()
+    try:
+        exporters = [threading.Thread(target=lambda: [trace.export(str(path)) for _ in range(50)]) for _ in range(4)]
+        for t in exporters:
+            t.start()
+        for t in exporters:
+            t.join()
+    finally:
+        stop.set()
+        updater.join()
+
+    assert len(json.loads(path.read_text())["spans"]) == len(spans)
+    assert [p.name for p in tmp_path.iterdir()] == ["trace.json"]
@@ -0,0 +1,33 @@
+import os
+import time
+
+from workspace import cleanup_files, cleanup_workspaces
+
+
+def _write(path, size, age):
+    path.write_bytes(b"x" * size)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+
+
+def test_cleanup_files_expires_then_trims_oldest(tmp_path):
+    _write(tmp_path / "expired.png", 10, age=100)
+    _write(tmp_path / "old.png", 40, age=30)
+    _write(tmp_path / "mid.png", 40, age=20)
+    _write(tmp_path / "new.png", 40, age=10)
+
+    removed = cleanup_files(str(tmp_path), ttl=60, max_bytes=80)
+    assert removed == ["expired.png", "old.png"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["mid.png", "new.png"]
+    assert cleanup_files(str(tmp_path / "missing")) == []
+
+
+def test_cleanup_workspaces_keeps_running_jobs(tmp_path):
+    for name, age in (("done", 100), ("running", 100), ("recent", 1)):
+        (tmp_path / name).mkdir()
+        _write(tmp_path / name / "job.json", 10, age)
+        stamp = time.time() - age
+        os.utime(tmp_path / name, (stamp, stamp))
+
+    assert cleanup_workspaces(str(tmp_path), ttl=60, max_bytes=1000, keep=["running"]) == ["done"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["recent", "running"]